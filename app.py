@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
-import asyncio
-from langchain.schema import HumanMessage
-from main import graph  
+from main import run_graph
+from telemetry import Trace
+from runtime import get_runner
+import queue
 import time
 import re
 
@@ -35,13 +36,70 @@ def make_urls_clickable(text):
     # Replace URLs with clickable links
     return re.sub(url_pattern, replace_url, text)
 
-# Async-safe runner for Streamlit thread
-def run_async_task(coro):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    result = loop.run_until_complete(coro)
-    loop.close()
-    return result
+def render_summary(container, text):
+    """
+    Render (possibly partial) summary markdown with clickable links
+    """
+    formatted_output = make_urls_clickable(text.replace('\n', '<br>'))
+    container.markdown(f"""
+    <div style="background: rgba(255,255,255,0.98); padding: 1.5rem; border-radius: 10px; color: #2c3e50; line-height: 1.6; border: 1px solid rgba(255,255,255,0.5); box-shadow: 0 4px 15px rgba(0,0,0,0.1);">
+        {formatted_output}
+    </div>
+    """, unsafe_allow_html=True)
+
+class TokenRenderer:
+    """
+    Drives the progress bar from pipeline progress events, collects streamed tokens
+    and re-renders the summary at most every `interval` seconds
+    """
+    def __init__(self, container, progress_bar=None, status_text=None, interval=0.1):
+        self.container = container
+        self.progress_bar = progress_bar
+        self.status_text = status_text
+        self.interval = interval
+        self.text = ""
+        self.percent = 0
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.last_render = 0.0
+
+    def on_event(self, event):
+        if event.get("type") == "progress":
+            # Parallel branches report overlapping ranges; never move the bar back.
+            self.percent = max(self.percent, event["percent"])
+            if self.progress_bar:
+                self.progress_bar.progress(self.percent)
+            if self.status_text:
+                self.status_text.markdown(f"**{event['message']}**")
+            return
+        if event.get("type") != "token":
+            return
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+        self.text += event["text"]
+        now = time.perf_counter()
+        if now - self.last_render >= self.interval:
+            render_summary(self.container, self.text)
+            self.last_render = now
+
+# Graph runs execute on the shared background loop; the Streamlit thread only polls
+def run_in_background(State, on_event, poll_interval=0.05, trace=None):
+    """
+    Submit a graph run to the process-wide runner and forward its events to
+    `on_event` from the Streamlit script thread until it finishes
+    """
+    events = queue.Queue()
+    future = get_runner().submit(run_graph(State, events.put, trace))
+    while True:
+        done = future.done()
+        while True:
+            try:
+                on_event(events.get_nowait())
+            except queue.Empty:
+                break
+        if done:
+            return future.result()
+        time.sleep(poll_interval)
 
 # Custom CSS for enhanced styling
 st.markdown("""
@@ -317,6 +375,8 @@ if 'current_output' not in st.session_state:
     st.session_state.current_output = ""
 if 'copy_success' not in st.session_state:
     st.session_state.copy_success = False
+if 'video_id' not in st.session_state:
+    st.session_state.video_id = None
 
 
 with st.sidebar:
@@ -372,6 +432,12 @@ with col1:
         height=120,
         key="user_input"
     )
+    # Follow-up questions go to the last video's transcript unless unticked.
+    about_video = bool(st.session_state.video_id) and st.checkbox(
+        "Question about the last video",
+        value=True,
+        help="Untick to ask the general assistant instead of searching the video's transcript."
+    )
 
 with col2:
     st.markdown("### Summary Settings")
@@ -421,27 +487,26 @@ if submit_button:
         status_text = st.empty()
         
         
-        progress_steps = [
-            (20, "Analyzing video content..."),
-            (40, "Processing with AI..."),
-            (60, "Generating summary..."),
-            (80, "Finalizing results..."),
-            (100, "Complete!")
-        ]
-        
         try:
-            for i, (progress, message) in enumerate(progress_steps[:-1]):
-                progress_bar.progress(progress)
-                status_text.markdown(f"**{message}**")
-                time.sleep(0.5)  
-            
-            
+            from langchain_core.messages import HumanMessage
             State = {
                 "messages": [HumanMessage(content=user_input)],
                 "summary_length": summary_length
             }
+            # Questions after a video are answered from that video's transcript.
+            if about_video:
+                State["video_id"] = st.session_state.video_id
             
-            response_state = run_async_task(graph.ainvoke(State))
+            st.markdown('</div>', unsafe_allow_html=True)
+            
+            st.markdown('<div class="result-container fade-in">', unsafe_allow_html=True)
+            st.markdown("### 🎯 AI-Generated Summary")
+            summary_container = st.empty()
+            renderer = TokenRenderer(summary_container, progress_bar, status_text)
+            
+            status_text.markdown("**Waiting for a free worker...**")
+            trace = Trace()
+            response_state = run_in_background(State, renderer.on_event, trace=trace)
             
             
             progress_bar.progress(100)
@@ -450,25 +515,17 @@ if submit_button:
             
             st.session_state.processing = False
             
-            st.markdown('</div>', unsafe_allow_html=True)
-            
             
             output = response_state["messages"][-1].content if "messages" in response_state else "⚠️ No final output found."
             st.session_state.current_output = output  
+            if response_state.get("video_id"):
+                st.session_state.video_id = response_state["video_id"]
             
-            st.markdown('<div class="result-container fade-in">', unsafe_allow_html=True)
-            st.markdown("### 🎯 AI-Generated Summary")
-            
-            
-            formatted_output = output.replace('\n', '<br>')
-            
-            formatted_output = make_urls_clickable(formatted_output)
-            
-            st.markdown(f"""
-            <div style="background: rgba(255,255,255,0.98); padding: 1.5rem; border-radius: 10px; color: #2c3e50; line-height: 1.6; border: 1px solid rgba(255,255,255,0.5); box-shadow: 0 4px 15px rgba(0,0,0,0.1);">
-                {formatted_output}
-            </div>
-            """, unsafe_allow_html=True)
+            render_summary(summary_container, output)
+            if renderer.first_token is not None:
+                st.caption(f"Time to first token: {renderer.first_token:.2f}s")
+            with st.expander("⏱️ Run details"):
+                st.json(trace.summary())
             
             st.markdown('</div>', unsafe_allow_html=True)
             
@@ -484,6 +541,7 @@ if submit_button:
             
             st.markdown("### Try These Solutions:")
             st.markdown("""
+            - Press "Process Video" again: video runs resume from the last completed step
             - Check if the YouTube URL is valid and accessible
             - Ensure your internet connection is stable
             - Try with a different video
@@ -0,0 +1,202 @@
+"""
+Batch mode: summarize many videos in one process.
+
+All graph runs share the process-wide keypoint scheduler, so they are
+paced against one rate-limit budget instead of each run assuming it owns
+the quota. Every finished video is appended to a JSONL file right away,
+and videos already summarized successfully at the same summary length in
+that file are skipped when the batch is restarted.
+
+    python batch.py urls.txt -o summaries.jsonl --length medium
+    python batch.py --playlist PLxxxxxxxx -o summaries.jsonl
+"""
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+import argparse, asyncio, json, os, re, time
+
+PLAYLIST_VIDEO_ID = re.compile(r'"videoId":"([A-Za-z0-9_-]{11})"')
+PLAYLIST_CONTINUATION = re.compile(r'"continuationCommand":\{"token":"([^"]+)"')
+INNERTUBE_KEY = re.compile(r'"INNERTUBE_API_KEY":"([^"]+)"')
+INNERTUBE_VERSION = re.compile(r'"INNERTUBE_CONTEXT_CLIENT_VERSION":"([^"]+)"')
+# Videos listed in the HTML of a playlist page; the rest come in continuations.
+PLAYLIST_PAGE_SIZE = 100
+HEADERS = {"User-Agent": "Mozilla/5.0", "Accept-Language": "en"}
+
+
+def read_urls(path: str) -> list:
+    """URLs from a text file, one per line; blank lines and # comments are ignored."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def fetch(url: str, payload: dict = None) -> str:
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    headers = {**HEADERS, "Content-Type": "application/json"} if data else HEADERS
+    with urlopen(Request(url, data=data, headers=headers), timeout=30) as response:
+        return response.read().decode("utf-8", "replace")
+
+
+def playlist_urls(playlist_id: str) -> list:
+    """
+    Video URLs of a public playlist, in playlist order.
+
+    Uses the YouTube Data API when YOUTUBE_API_KEY is set. Otherwise the
+    playlist page is scraped and its continuations are followed through the
+    endpoint the page itself uses, past the first PLAYLIST_PAGE_SIZE videos.
+    """
+    api_key = os.getenv("YOUTUBE_API_KEY")
+    video_ids = playlist_ids_from_api(playlist_id, api_key) if api_key else playlist_ids_from_page(playlist_id)
+    return [f"https://www.youtube.com/watch?v={video_id}" for video_id in video_ids]
+
+
+def playlist_ids_from_api(playlist_id: str, api_key: str) -> list:
+    """Video IDs of a playlist from the Data API's playlistItems, 50 per page."""
+    video_ids, page_token = [], None
+    while True:
+        query = {"part": "contentDetails", "playlistId": playlist_id, "maxResults": 50, "key": api_key}
+        if page_token:
+            query["pageToken"] = page_token
+        data = json.loads(fetch(f"https://www.googleapis.com/youtube/v3/playlistItems?{urlencode(query)}"))
+        video_ids.extend(item["contentDetails"]["videoId"] for item in data.get("items", []))
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            return list(dict.fromkeys(video_ids))
+
+
+def playlist_ids_from_page(playlist_id: str) -> list:
+    """Video IDs scraped from the playlist page and its continuations."""
+    html = fetch(f"https://www.youtube.com/playlist?list={playlist_id}")
+    video_ids = dict.fromkeys(PLAYLIST_VIDEO_ID.findall(html))
+    token = PLAYLIST_CONTINUATION.search(html)
+    key, version = INNERTUBE_KEY.search(html), INNERTUBE_VERSION.search(html)
+    while token and key and version:
+        payload = {"context": {"client": {"clientName": "WEB", "clientVersion": version.group(1), "hl": "en"}},
+                   "continuation": token.group(1)}
+        try:
+            page = fetch(f"https://www.youtube.com/youtubei/v1/browse?key={key.group(1)}", payload)
+        except OSError as e:
+            print(f"Warning: playlist {playlist_id} continuation failed ({e}); "
+                  f"only the first {len(video_ids)} videos are summarized.")
+            break
+        found = len(video_ids)
+        video_ids.update(dict.fromkeys(PLAYLIST_VIDEO_ID.findall(page)))
+        if len(video_ids) == found:
+            token = None
+            break
+        token = PLAYLIST_CONTINUATION.search(page)
+    if token or len(video_ids) == PLAYLIST_PAGE_SIZE:
+        print(f"Warning: playlist {playlist_id} listed {len(video_ids)} videos, it may have more; "
+              f"set YOUTUBE_API_KEY to list it through the Data API.")
+    return list(video_ids)
+
+
+def completed_videos(path: str) -> set:
+    """(video ID, summary length) pairs already summarized successfully in an output JSONL file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted run
+            if record.get("status") == "ok":
+                done.add((record.get("video_id"), record.get("summary_length", "medium")))
+    return done
+
+
+async def summarize(url: str, summary_length: str, trace=None) -> dict:
+    from langchain_core.messages import AIMessage, HumanMessage
+    from main import run_graph
+    state = await run_graph({"messages": [HumanMessage(content=url)], "summary_length": summary_length},
+                            trace=trace)
+    last = (state or {}).get("messages", [None])[-1]
+    if not isinstance(last, AIMessage):
+        raise RuntimeError("The graph finished without a summary.")
+    return {"summary": last.content, "keypoints": state.get("keypoints")}
+
+
+async def run_batch(urls: list, output: str, summary_length: str = "medium", concurrency: int = 4) -> dict:
+    """
+    Summarize `urls` concurrently and append one JSONL record per video.
+
+    Returns:
+        dict: Throughput report.
+    """
+    from main import response_cache
+    from telemetry import Trace
+    from transcripts import canonical_video_id
+
+    done = completed_videos(output)
+    jobs, skipped = {}, set()
+    for url in urls:
+        video_id = canonical_video_id(url)
+        if video_id is None:
+            print(f"Skipping invalid YouTube URL: {url}")
+        elif (video_id, summary_length) in done:
+            skipped.add(video_id)
+        else:
+            jobs.setdefault(video_id, url)
+    print(f"{len(jobs)} videos to summarize, {len(skipped)} already done at {summary_length} length in {output}.")
+
+    slots = asyncio.Semaphore(concurrency)
+    lock = asyncio.Lock()
+    report = {"videos": 0, "failures": 0, "skipped": len(skipped)}
+    llm = {"calls": 0, "cache_hits": 0, "prompt_tokens": 0, "response_tokens": 0}
+    start = time.perf_counter()
+
+    async def one(video_id, url):
+        async with slots:
+            began = time.perf_counter()
+            record = {"video_id": video_id, "url": url, "summary_length": summary_length}
+            trace = Trace()
+            try:
+                record.update(await summarize(url, summary_length, trace), status="ok")
+                report["videos"] += 1
+            except Exception as e:
+                record.update(status="error", error=str(e))
+                report["failures"] += 1
+            # Every model call of the run (Gemini and Groq, failed videos included).
+            calls = trace.summary()["llm"]
+            record["llm"] = {key: calls[key] for key in llm}
+            for key in llm:
+                llm[key] += calls[key]
+            record["seconds"] = round(time.perf_counter() - began, 2)
+            record["finished_at"] = datetime.now(timezone.utc).isoformat()
+            async with lock:
+                with open(output, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            print(f"[{record['status']}] {video_id} in {record['seconds']}s")
+
+    await asyncio.gather(*(one(video_id, url) for video_id, url in jobs.items()))
+
+    elapsed = time.perf_counter() - start
+    report["elapsed_seconds"] = round(elapsed, 1)
+    report["videos_per_hour"] = round(report["videos"] / elapsed * 3600, 1) if elapsed else 0.0
+    report["llm"] = llm
+    report["llm_cache"] = dict(response_cache.stats) if response_cache else None
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a list of YouTube videos or a playlist.")
+    parser.add_argument("urls_file", nargs="?", help="Text file with one YouTube URL per line.")
+    parser.add_argument("--playlist", help="YouTube playlist ID to summarize instead of a file.")
+    parser.add_argument("-o", "--output", default="summaries.jsonl", help="JSONL file to append results to.")
+    parser.add_argument("--length", default="medium", choices=["short", "medium", "long"])
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", "4")),
+                        help="Videos processed at the same time.")
+    args = parser.parse_args()
+    if bool(args.urls_file) == bool(args.playlist):
+        parser.error("Pass either a URLs file or --playlist.")
+
+    urls = read_urls(args.urls_file) if args.urls_file else playlist_urls(args.playlist)
+    report = asyncio.run(run_batch(urls, args.output, args.length, args.concurrency))
+    print("Throughput report:")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""Offline benchmarks and checks (see the Benchmarks section of the README)."""
+import json, os
+
+# Default location of the JSON reports; git-ignored.
+RESULTS_DIR = "benchmark-results"
+
+
+def write_report(report: dict, path: str):
+    """Write a JSON report, creating its directory if needed."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
@@ -0,0 +1,59 @@
+"""
+Wall-clock comparison of the summary1/summary2 fan-out run concurrently
+(as the graph does after Keypoint_Extractor) versus one after the other.
+
+Model and search calls are replaced with fakes that only sleep, so the
+numbers measure scheduling, not the network.
+
+    python -m benchmarks.async_fanout --llm-latency 1.5 --search-latency 0.8
+"""
+from types import SimpleNamespace
+import argparse, asyncio, time
+
+import main
+from search import TopicSearcher
+
+
+class SleepyChatModel:
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(content="explanation")
+
+
+def sleepy_search(latency):
+    def search(query):
+        time.sleep(latency)
+        return [{"url": f"https://example.com/{hash(query)}", "content": f"about {query}"}]
+    return search
+
+
+async def run(llm_latency, search_latency, topics):
+    main.llm = SleepyChatModel(llm_latency)
+    state = {"keypoints": "\n".join(f"{i}. Topic {i}" for i in range(1, topics + 1))}
+
+    main.topic_search = TopicSearcher(backend=sleepy_search(search_latency))
+    start = time.perf_counter()
+    await main.summary1(state)
+    await main.summary2(state)
+    sequential = time.perf_counter() - start
+
+    main.topic_search = TopicSearcher(backend=sleepy_search(search_latency))
+    start = time.perf_counter()
+    await asyncio.gather(main.summary1(state), main.summary2(state))
+    concurrent = time.perf_counter() - start
+
+    print(f"sequential: {sequential:.2f}s")
+    print(f"concurrent: {concurrent:.2f}s")
+    print(f"saved:      {sequential - concurrent:.2f}s ({1 - concurrent / sequential:.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--llm-latency", type=float, default=1.5)
+    parser.add_argument("--search-latency", type=float, default=0.8)
+    parser.add_argument("--topics", type=int, default=12)
+    args = parser.parse_args()
+    asyncio.run(run(args.llm_latency, args.search_latency, args.topics))
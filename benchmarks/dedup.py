@@ -0,0 +1,68 @@
+"""
+Local keypoint dedup: which topics it merges, and the tokens it saves.
+
+Runs `dedupe_keypoints` on small hand-written segment lists whose expected
+result is known (true duplicates that should be folded, related topics that
+must stay apart) and exits non-zero if one of them comes out different.
+
+    python -m benchmarks.dedup --threshold 0.75
+"""
+import argparse, sys
+
+from dedup import dedupe_keypoints, parse_keypoints
+
+# (name, segment lists, expected topics with their subtopics, in order)
+CASES = [
+    (
+        "plural and stopword variants are one topic",
+        ["1. Gradient Descent\n   - Learning rate\n2. Loss functions",
+         "1. Gradient descents\n   - Learning rates\n   - Local minima\n2. The loss function"],
+        [("Gradient Descent", ["Learning rate", "Local minima"]), ("Loss functions", [])],
+    ),
+    (
+        "a qualified title is its own topic",
+        ["1. Neural Networks\n   - Backpropagation\n   - Activation functions",
+         "1. Convolutional Neural Networks\n   - Pooling layers\n   - Image filters"],
+        [("Neural Networks", ["Backpropagation", "Activation functions"]),
+         ("Convolutional Neural Networks", ["Pooling layers", "Image filters"])],
+    ),
+    (
+        "a qualified title without subtopics is its own topic",
+        ["1. Neural Networks", "1. Convolutional Neural Networks"],
+        [("Neural Networks", []), ("Convolutional Neural Networks", [])],
+    ),
+    (
+        "a reworded title with the same subtopics is one topic",
+        ["1. Neural Networks\n   - Backpropagation\n   - Activation functions\n   - Weight initialization",
+         "1. Neural Network Basics\n   - Backpropagation\n   - Activation functions\n   - Weight initialization"],
+        [("Neural Networks", ["Backpropagation", "Activation functions", "Weight initialization"])],
+    ),
+]
+
+
+def run_case(segment_lists: list, threshold: float) -> list:
+    texts, _ = dedupe_keypoints(segment_lists, threshold)
+    return [topic for text in texts for topic in parse_keypoints(text)]
+
+
+def main(threshold: float) -> int:
+    failures = 0
+    for name, segment_lists, expected in CASES:
+        got = [(topic, subtopics) for topic, subtopics in run_case(segment_lists, threshold)]
+        ok = got == expected
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+        if not ok:
+            print(f"       expected {expected}\n       got      {got}")
+    segment_lists = [text for _, lists, _ in CASES for text in lists]
+    _, stats = dedupe_keypoints(segment_lists, threshold)
+    print(f"all cases together: {stats['topics_in']} -> {stats['topics_out']} topics, "
+          f"{stats['tokens_saved']} of {stats['tokens_in']} tokens saved")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threshold", type=float, default=0.75)
+    args = parser.parse_args()
+    sys.exit(main(args.threshold))
@@ -0,0 +1,191 @@
+"""
+Offline stand-ins for YouTube, Groq, Gemini and Tavily.
+
+Each fake has a configurable latency distribution, error rate and rate
+limit, so the pipeline can be measured (and its retry/pacing logic
+exercised) without API keys or network access.
+"""
+from types import SimpleNamespace
+import asyncio, hashlib, random, re, threading, time
+
+from benchmarks.segmenter import synthetic_transcript
+
+
+class LatencyModel:
+    """
+    Latency distribution of a fake backend, in seconds.
+
+    Args:
+        median (float): Median latency.
+        sigma (float): Log-normal shape; 0 gives a constant latency.
+        per_1k_tokens (float): Extra latency per 1000 prompt tokens.
+    """
+
+    def __init__(self, median: float = 0.05, sigma: float = 0.4, per_1k_tokens: float = 0.0, seed: int = 0):
+        self.median = median
+        self.sigma = sigma
+        self.per_1k_tokens = per_1k_tokens
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, prompt_chars: int = 0) -> float:
+        with self._lock:
+            base = self.median * (self.rng.lognormvariate(0, self.sigma) if self.sigma else 1.0)
+        return base + self.per_1k_tokens * prompt_chars / 4000
+
+
+class ResourceExhausted(Exception):
+    """Raised by a fake when its rate limit is exceeded (named like the Google error)."""
+
+
+class FakeBackend:
+    """
+    Shared behaviour of the fakes: latency, random failures, RPM limit.
+
+    Args:
+        latency (LatencyModel): Latency distribution.
+        error_rate (float): Probability that a call fails with a 503.
+        rpm (int | None): Calls per rolling minute before 429s are raised.
+    """
+
+    def __init__(self, latency: LatencyModel = None, error_rate: float = 0.0, rpm: int = None, seed: int = 0):
+        self.latency = latency or LatencyModel(seed=seed)
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.rng = random.Random(seed + 1)
+        self.calls = []
+        self.stats = {"calls": 0, "errors": 0, "throttled": 0}
+        self._lock = threading.Lock()
+
+    def _admit(self, prompt_chars: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            self.stats["calls"] += 1
+            if self.rpm is not None:
+                self.calls = [t for t in self.calls if now - t < 60]
+                if len(self.calls) >= self.rpm:
+                    self.stats["throttled"] += 1
+                    raise ResourceExhausted("429 Resource has been exhausted (fake quota).")
+                self.calls.append(now)
+            if self.rng.random() < self.error_rate:
+                self.stats["errors"] += 1
+                raise ConnectionError("503 Service unavailable (fake).")
+        return self.latency.sample(prompt_chars)
+
+
+def fake_keypoints(prompt: str, topics: int = 5) -> str:
+    """Deterministic numbered list derived from the prompt text (at most 21 topics)."""
+    digest = hashlib.sha512(prompt.encode("utf-8")).hexdigest()
+    lines = []
+    for i in range(topics):
+        word = digest[i * 6:(i + 1) * 6]
+        lines.append(f"{i + 1}. Topic {word}")
+        lines.append(f"   - Detail {word[:3]} one")
+        lines.append(f"   - Detail {word[3:]} two")
+    return "\n".join(lines)
+
+
+class FakeGenerativeModel(FakeBackend):
+    """Stand-in for `genai.GenerativeModel` (sync, async and streaming calls)."""
+
+    def __init__(self, *args, output_chars: int = 3000, chunk_chars: int = 60, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output_chars = output_chars
+        self.chunk_chars = chunk_chars
+
+    def _text(self, contents) -> str:
+        text = str(contents)
+        if "extract concise" in text or "de-duplicate" in text:
+            return fake_keypoints(text)
+        words = (fake_keypoints(text, 12) + "\nhttps://example.com/source ").split(" ")
+        out = []
+        while sum(len(w) + 1 for w in out) < self.output_chars:
+            out.extend(words)
+        return " ".join(out)[: self.output_chars]
+
+    def generate_content(self, contents, **kwargs):
+        time.sleep(self._admit(len(str(contents))))
+        return SimpleNamespace(text=self._text(contents))
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        delay = self._admit(len(str(contents)))
+        text = self._text(contents)
+        if not stream:
+            await asyncio.sleep(delay)
+            return SimpleNamespace(text=text)
+
+        async def chunks():
+            # Time to first token is the sampled latency; the rest streams quickly.
+            await asyncio.sleep(delay)
+            for i in range(0, len(text), self.chunk_chars):
+                await asyncio.sleep(0.001)
+                yield SimpleNamespace(text=text[i:i + self.chunk_chars])
+
+        return chunks()
+
+
+class FakeChatModel(FakeBackend):
+    """Stand-in for the LangChain chat model returned by `init_chat_model`."""
+
+    def invoke(self, prompt, **kwargs):
+        time.sleep(self._admit(len(str(prompt))))
+        return SimpleNamespace(content=fake_keypoints(str(prompt), 12))
+
+    async def ainvoke(self, prompt, **kwargs):
+        await asyncio.sleep(self._admit(len(str(prompt))))
+        return SimpleNamespace(content=fake_keypoints(str(prompt), 12))
+
+
+class FakeSearch(FakeBackend):
+    """Stand-in for Tavily: a `query -> results` backend for TopicSearcher."""
+
+    def __call__(self, query: str) -> list:
+        time.sleep(self._admit(len(query)))
+        digest = hashlib.sha256(query.encode("utf-8")).hexdigest()[:8]
+        return [
+            {"url": f"https://example.com/{digest}/{i}", "content": f"Snippet {i} about {query}. " * 8}
+            for i in range(3)
+        ]
+
+
+class FakeYoutubeLoader:
+    """
+    Stand-in for `YoutubeLoader`: serves synthetic transcripts of a given length.
+
+    Fetching takes `latency` plus `fetch_seconds_per_hour` per hour of video,
+    spread over the chunks of `lazy_load()`.
+    """
+
+    minutes = 10
+    words_per_minute = 150
+    latency = LatencyModel(median=0.2, sigma=0.3)
+    fetch_seconds_per_hour = 0.0
+
+    def __init__(self, video_id=None, chunk_size_seconds: int = None, **kwargs):
+        self.video_id = video_id
+        self.chunk_size_seconds = chunk_size_seconds
+
+    @classmethod
+    def from_youtube_url(cls, url, **kwargs):
+        return cls(url, **kwargs)
+
+    def load(self):
+        return list(self.lazy_load())
+
+    def lazy_load(self):
+        from langchain_core.documents import Document
+        time.sleep(self.latency.sample())
+        text = synthetic_transcript(self.minutes / 60, self.words_per_minute)
+        fetch_seconds = self.fetch_seconds_per_hour * self.minutes / 60
+        if not self.chunk_size_seconds:
+            time.sleep(fetch_seconds)
+            yield Document(page_content=text, metadata={"source": self.video_id})
+            return
+        # Timestamped caption chunks, like TranscriptFormat.CHUNKS. Cut with a
+        # regex so the fake does not hold a string per word (see state_memory).
+        per_chunk = max(1, self.words_per_minute * self.chunk_size_seconds // 60)
+        count = -(-(text.count(" ") + 1) // per_chunk)
+        for i, match in enumerate(re.finditer(r"(?:\S+ ?){1,%d}" % per_chunk, text)):
+            time.sleep(fetch_seconds / count)
+            yield Document(page_content=match.group().rstrip(),
+                           metadata={"source": self.video_id, "start_seconds": i * self.chunk_size_seconds})
@@ -0,0 +1,100 @@
+"""
+Cold start cost of `import main`, measured with `python -X importtime`.
+
+Each repeat runs in a fresh interpreter. Besides the import itself it
+times building the graph and the model handles, which is where the heavy
+LangGraph/LangChain/Gemini imports are paid now that `main` defers them.
+
+    python -m benchmarks.import_time -o before.json
+    python -m benchmarks.import_time -o after.json --compare before.json
+"""
+from benchmarks import RESULTS_DIR, write_report
+from datetime import datetime, timezone
+import argparse, json, os, re, statistics, subprocess, sys
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+# The hasattr fallbacks keep the scenarios runnable on commits from before the
+# lazy factories, so a baseline can be taken there.
+SCENARIOS = {
+    "import main": "import main",
+    "import main + build graph": "import main; main.get_graph() if hasattr(main, 'get_graph') else main.graph",
+    "import main + models": (
+        "import main\n"
+        "if hasattr(main, 'get_graph'): main.get_graph(); main.get_llm(); main.get_llm2()"
+    ),
+}
+
+
+def measure(code: str) -> dict:
+    """Run `code` in a fresh interpreter; returns total and per top-level module microseconds."""
+    env = {**os.environ, "GROQ_API_KEY": os.getenv("GROQ_API_KEY", "offline"),
+           "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "offline"), "PYTHONWARNINGS": "ignore"}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, env=env, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        # One space of indentation marks a module imported directly by the code.
+        if match and len(match.group(3)) == 1:
+            modules[match.group(4)] = modules.get(match.group(4), 0) + int(match.group(2))
+    return {"total_us": sum(modules.values()), "modules": modules}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(repeats: int, top: int) -> dict:
+    results = {}
+    for name, code in SCENARIOS.items():
+        runs = [measure(code) for _ in range(repeats)]
+        totals = [r["total_us"] / 1e6 for r in runs]
+        slowest = sorted(runs[-1]["modules"].items(), key=lambda item: -item[1])[:top]
+        results[name] = {
+            "median_seconds": round(statistics.median(totals), 3),
+            "min_seconds": round(min(totals), 3),
+            "top_modules": {module: round(us / 1e6, 3) for module, us in slowest},
+        }
+        print(f"{name:<28} median {results[name]['median_seconds']:6.3f}s  min {results[name]['min_seconds']:6.3f}s")
+        for module, seconds in results[name]["top_modules"].items():
+            print(f"{'':>4}{module:<40}{seconds:7.3f}s")
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "repeats": repeats,
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict):
+    print(f"\nCompared with {baseline.get('commit')} ({baseline.get('created_at')}):")
+    for name, result in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old:
+            before, after = old["median_seconds"], result["median_seconds"]
+            change = f"{(after - before) / before:+.0%}" if before else "n/a"
+            print(f"{name:<28} {before:.3f}s -> {after:.3f}s ({change})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="Slowest top-level imports to list.")
+    parser.add_argument("-o", "--output", default=os.path.join(RESULTS_DIR, "import-time.json"))
+    parser.add_argument("--compare", help="Previous results JSON to compare against.")
+    args = parser.parse_args()
+
+    report = run(args.repeats, args.top)
+    write_report(report, args.output)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
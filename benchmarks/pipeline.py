@@ -0,0 +1,209 @@
+"""
+Offline end-to-end benchmark of the whole graph.
+
+YouTube, Groq, Gemini and Tavily are replaced with the fakes from
+benchmarks/fakes.py, all caches and checkpoints are disabled, and the
+graph is run on synthetic transcripts of increasing length. Reports
+per-node wall time, end-to-end p50/p95 and peak Python memory, and writes
+the results as JSON so two commits can be compared:
+
+    python -m benchmarks.pipeline -o before.json
+    python -m benchmarks.pipeline -o after.json --compare before.json
+    python -m benchmarks.pipeline --durations 2 60 300 --repeats 5 --llm-error-rate 0.05
+
+The staged and streaming transcript paths are compared the same way:
+
+    python -m benchmarks.pipeline --fetch-seconds-per-hour 2 -o staged.json
+    python -m benchmarks.pipeline --fetch-seconds-per-hour 2 --streaming -o streaming.json --compare staged.json
+"""
+from benchmarks import RESULTS_DIR, write_report
+from datetime import datetime, timezone
+import argparse, asyncio, json, os, statistics, subprocess, sys, tempfile, time, tracemalloc
+
+DEFAULT_DURATIONS = [2, 10, 30, 60, 120, 300]  # minutes
+
+
+def configure_env(args):
+    """Must run before `main` is imported: it reads its settings at import time."""
+    os.environ.update({
+        "GROQ_API_KEY": os.getenv("GROQ_API_KEY", "offline"),
+        "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "offline"),
+        "LLM_CACHE": "0",
+        "TRANSCRIPT_CACHE": "0",
+        "INTERMEDIATE_CACHE": "0",
+        "CHECKPOINTS": "0",
+        "YT_CACHE_DIR": tempfile.mkdtemp(prefix="yt-bench-"),
+        "GEMINI_RPM": str(args.scheduler_rpm),
+        "GEMINI_TPM": str(args.scheduler_tpm),
+        "TRANSCRIPT_STREAMING": "1" if args.streaming else "0",
+        "HEDGE_TARGET": args.hedge,
+    })
+
+
+def install_fakes(main, args):
+    from benchmarks.fakes import (FakeChatModel, FakeGenerativeModel, FakeSearch,
+                                  FakeYoutubeLoader, LatencyModel)
+    from llm_cache import CachedChatModel, CachedGenerativeModel
+    from search import TopicSearcher
+
+    gemini = FakeGenerativeModel(LatencyModel(args.llm_latency, args.llm_sigma, args.llm_latency_per_1k),
+                                 error_rate=args.llm_error_rate, rpm=args.llm_rpm, seed=args.seed)
+    groq = FakeChatModel(LatencyModel(args.llm_latency, args.llm_sigma, seed=args.seed + 1),
+                         error_rate=args.llm_error_rate, seed=args.seed + 1)
+    search = FakeSearch(LatencyModel(args.search_latency, args.llm_sigma, seed=args.seed + 2),
+                        error_rate=args.search_error_rate, seed=args.seed + 2)
+    FakeYoutubeLoader.fetch_seconds_per_hour = args.fetch_seconds_per_hour
+    main.YoutubeLoader = FakeYoutubeLoader
+    main.llm = CachedChatModel(groq, main.GROQ_MODEL)
+    main.llm2 = CachedGenerativeModel(gemini, main.GEMINI_MODEL)
+    main.topic_search = TopicSearcher(backend=search, max_workers=main.topic_search.max_workers)
+    return {"gemini": gemini, "groq": groq, "search": search}
+
+
+async def run_once(main, minutes: float, index: int) -> dict:
+    """One graph run; per-node seconds come from the run's trace."""
+    from benchmarks.fakes import FakeYoutubeLoader
+    from langchain_core.messages import HumanMessage
+    from telemetry import Trace
+
+    FakeYoutubeLoader.minutes = minutes
+    video_id = f"bench{index:06d}"[:11]
+    inputs = {"messages": [HumanMessage(content=f"https://www.youtube.com/watch?v={video_id}")],
+              "summary_length": "medium"}
+    trace, error = Trace(), None
+    start = time.perf_counter()
+    try:
+        await main.run_graph(inputs, trace=trace)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    summary = trace.summary()
+    return {"seconds": time.perf_counter() - start, "nodes": summary["nodes"],
+            "queue_wait": summary["scheduler"]["wait_seconds"], "error": error}
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * q
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+async def run(args) -> dict:
+    import main
+    fakes = install_fakes(main, args)
+    results = []
+    index = 0
+    for minutes in args.durations:
+        runs = []
+        tracemalloc.start()
+        for _ in range(args.repeats):
+            index += 1
+            runs.append(await run_once(main, minutes, index))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        ok = [r for r in runs if not r["error"]]
+        seconds = [r["seconds"] for r in ok]
+        node_names = sorted({name for r in ok for name in r["nodes"]})
+        result = {
+            "minutes": minutes,
+            "runs": len(runs),
+            "failures": len(runs) - len(ok),
+            "p50_seconds": round(percentile(seconds, 0.5), 3),
+            "p95_seconds": round(percentile(seconds, 0.95), 3),
+            "peak_memory_mb": round(peak / 1024 / 1024, 2),
+            "nodes": {name: round(statistics.median(r["nodes"].get(name, 0.0) for r in ok), 3)
+                      for name in node_names},
+            "queue_wait_seconds": round(statistics.median(r["queue_wait"] for r in ok), 3) if ok else 0.0,
+            "errors": sorted({r["error"] for r in runs if r["error"]}),
+        }
+        results.append(result)
+        print(f"{minutes:>6g} min  p50 {result['p50_seconds']:7.2f}s  p95 {result['p95_seconds']:7.2f}s  "
+              f"peak {result['peak_memory_mb']:7.1f} MB  failures {result['failures']}/{len(runs)}")
+        for name, value in result["nodes"].items():
+            print(f"{'':>12}{name:<22}{value:7.3f}s")
+        print(f"{'':>12}{'(scheduler queue wait)':<22}{result['queue_wait_seconds']:7.3f}s")
+    for hedger in (main.segment_hedger, main.consolidation_hedger, main.writer_hedger):
+        if hedger is not None:
+            print(f"Hedging ({hedger.name}): {hedger.stats}")
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "fakes": {name: dict(fake.stats) for name, fake in fakes.items()},
+        "scheduler": dict(main.keypoint_scheduler.stats),
+        "hedgers": {hedger.name: dict(hedger.stats) for hedger in (main.segment_hedger, main.consolidation_hedger, main.writer_hedger)
+                    if hedger is not None},
+        "results": results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(report: dict, baseline: dict):
+    """Print p50/p95/memory deltas against a previous report, matched by duration."""
+    previous = {r["minutes"]: r for r in baseline.get("results", [])}
+    print(f"\nCompared with {baseline.get('commit')} ({baseline.get('created_at')}):")
+    for result in report["results"]:
+        old = previous.get(result["minutes"])
+        if not old:
+            continue
+        deltas = []
+        for key in ("p50_seconds", "p95_seconds", "peak_memory_mb"):
+            before, after = old[key], result[key]
+            change = f"{(after - before) / before:+.0%}" if before else "n/a"
+            deltas.append(f"{key} {before:g} -> {after:g} ({change})")
+        print(f"{result['minutes']:>6g} min  " + "  ".join(deltas))
+
+
+def build_parser(description: str = None):
+    """Options of the fake backends, shared with the other graph benchmarks."""
+    parser = argparse.ArgumentParser(description=description or __doc__.strip().splitlines()[0])
+    parser.add_argument("--durations", type=float, nargs="+", default=DEFAULT_DURATIONS,
+                        help="Synthetic transcript lengths in minutes.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Median model latency (s).")
+    parser.add_argument("--llm-latency-per-1k", type=float, default=0.002,
+                        help="Extra model latency per 1000 prompt tokens (s).")
+    parser.add_argument("--llm-sigma", type=float, default=0.4, help="Log-normal latency spread.")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-rpm", type=int, default=None, help="Fake Gemini quota (429 above it).")
+    parser.add_argument("--search-latency", type=float, default=0.03)
+    parser.add_argument("--fetch-seconds-per-hour", type=float, default=0.0,
+                        help="Fake transcript fetch time per hour of video (s), spread over its chunks.")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Run the streaming transcript path (TRANSCRIPT_STREAMING=1).")
+    parser.add_argument("--search-error-rate", type=float, default=0.0)
+    parser.add_argument("--scheduler-rpm", type=int, default=10000, help="GEMINI_RPM seen by the scheduler.")
+    parser.add_argument("--scheduler-tpm", type=int, default=100_000_000, help="GEMINI_TPM seen by the scheduler.")
+    parser.add_argument("--hedge", choices=["groq", "same", "off"], default="groq",
+                        help="HEDGE_TARGET of late keypoint/writer calls.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=os.path.join(RESULTS_DIR, "pipeline.json"))
+    parser.add_argument("--compare", help="Previous results JSON to compare against.")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    configure_env(args)
+    report = asyncio.run(run(args))
+    write_report(report, args.output)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
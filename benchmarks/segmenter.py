@@ -0,0 +1,78 @@
+"""
+Token-budget segmenter versus the old split-then-rejoin path on a long
+synthetic transcript.
+
+The old path splits the transcript with RecursiveCharacterTextSplitter into
+`chunk_size` pieces and joins every `segment_size` of them back together;
+the segmenter computes (start, end) offsets in one pass over the string.
+
+    python -m benchmarks.segmenter --hours 5
+"""
+import argparse, random, time, tracemalloc
+
+from planner import estimate_tokens, plan_chunking, plan_segment_tokens
+from segmenter import segment_offsets
+
+WORDS = ("so the model learns a representation of the input and then we apply "
+         "gradient descent to minimize the loss function which is basically how "
+         "neural networks are trained in practice you know").split()
+
+
+def synthetic_transcript(hours: float, words_per_minute: int = 150, seed: int = 0) -> str:
+    """Caption-like text: mostly unpunctuated words with occasional sentence ends."""
+    rng = random.Random(seed)
+    words = []
+    for i in range(int(hours * 60 * words_per_minute)):
+        word = rng.choice(WORDS)
+        if rng.random() < 0.03:
+            word += "."
+        words.append(word)
+    return " ".join(words)
+
+
+def split_join(text: str) -> list:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    plan = plan_chunking(len(text))
+    chunks = RecursiveCharacterTextSplitter(chunk_size=plan["chunk_size"]).split_text(text)
+    size = plan["segment_size"]
+    return [" ".join(chunks[i:i + size]) for i in range(0, len(chunks), size)]
+
+
+def offsets(text: str) -> list:
+    return segment_offsets(text, plan_segment_tokens(len(text)))
+
+
+def measure(fn, text: str, repeats: int):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def main(hours: float, repeats: int):
+    text = synthetic_transcript(hours)
+    print(f"transcript: {len(text):,} chars (~{estimate_tokens(text):,} tokens, {hours}h)")
+
+    segments, seconds, peak = measure(split_join, text, repeats)
+    sizes = [estimate_tokens(s) for s in segments]
+    print(f"split+join: {seconds * 1000:8.1f} ms  peak {peak / 1e6:6.2f} MB  "
+          f"{len(segments)} segments, max {max(sizes):,} tokens")
+
+    spans, seconds, peak = measure(offsets, text, repeats)
+    sizes = [estimate_tokens(end - start) for start, end in spans]
+    print(f"segmenter:  {seconds * 1000:8.1f} ms  peak {peak / 1e6:6.2f} MB  "
+          f"{len(spans)} segments, max {max(sizes):,} tokens")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hours", type=float, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    main(args.hours, args.repeats)
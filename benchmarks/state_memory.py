@@ -0,0 +1,163 @@
+"""
+Peak memory and checkpoint size of the graph state on long transcripts.
+
+Runs video requests offline against the fakes of benchmarks.pipeline. For
+each transcript length, `--users` requests for different videos run
+concurrently under tracemalloc to get the peak of Python allocations. One
+more run records the state after every graph step and how many bytes a
+checkpointer would serialize for it (LangGraph's JsonPlusSerializer), per
+field, to show which fields keep the transcript alive.
+
+It exits non-zero if the raw transcript is still in the state after
+preprocessing, or if on the longest transcript the peak (per concurrent
+request) or the checkpointed bytes per hour of video exceed
+`--max-peak-mb-per-hour` / `--max-checkpointed-kb-per-hour`:
+
+    python -m benchmarks.state_memory -o before.json
+    python -m benchmarks.state_memory -o after.json --compare before.json
+"""
+from benchmarks import RESULTS_DIR, write_report
+from benchmarks.pipeline import build_parser, configure_env, git_commit, install_fakes
+from datetime import datetime, timezone
+import asyncio, json, os, sys, tracemalloc
+
+DEFAULT_DURATIONS = [60, 180, 300]  # minutes
+# Measured 0.36-0.43 MB and 276 KB with the transcript dropped after
+# preprocessing, 550 KB checkpointed while the state still carried it. The
+# peak varies by ~20% between runs, so its bound only catches larger growth.
+MAX_PEAK_MB_PER_HOUR = 0.55
+MAX_CHECKPOINTED_KB_PER_HOUR = 320
+
+
+def request(index: int, minutes: float) -> dict:
+    from langchain_core.messages import HumanMessage
+    video_id = f"mem{int(minutes):04d}{index:04d}"[:11]
+    return {"messages": [HumanMessage(content=f"https://www.youtube.com/watch?v={video_id}")],
+            "summary_length": "medium"}
+
+
+async def peak_memory(main, minutes: float, users: int, offset: int) -> float:
+    """Peak traced MB while `users` requests for different videos run at once."""
+    tracemalloc.start()
+    try:
+        await asyncio.gather(*(main.run_graph(request(offset + i, minutes)) for i in range(users)))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+async def state_sizes(main, minutes: float, index: int) -> list:
+    """Serialized bytes of the state after every step of one run, in total and per field."""
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    serde = JsonPlusSerializer()
+    steps, nodes = [], []
+    async for mode, chunk in main.get_graph().astream(request(index, minutes),
+                                                      stream_mode=["updates", "values"]):
+        if mode == "updates":
+            nodes.extend(chunk)
+            continue
+        fields = {name: len(serde.dumps_typed(value)[1]) for name, value in chunk.items()}
+        steps.append({"after": ",".join(nodes) or "input", "bytes": sum(fields.values()), "fields": fields,
+                      "raw_transcript": chunk.get("raw_transcript") is not None})
+        nodes = []
+    return steps
+
+
+async def run(args) -> dict:
+    import main
+    from benchmarks.fakes import FakeYoutubeLoader
+    install_fakes(main, args)
+    # Warm up: the graph, models and lazy imports are built by the first run.
+    FakeYoutubeLoader.minutes = 1
+    await main.run_graph(request(9999, 1))
+    results = []
+    for n, minutes in enumerate(args.durations):
+        FakeYoutubeLoader.minutes = minutes
+        peak = await peak_memory(main, minutes, args.users, n * 100)
+        steps = await state_sizes(main, minutes, n * 100 + args.users)
+        largest = max(steps, key=lambda step: step["bytes"])
+        result = {
+            "minutes": minutes,
+            "users": args.users,
+            "peak_memory_mb": round(peak, 2),
+            "largest_state_kb": round(largest["bytes"] / 1024, 1),
+            "checkpointed_kb": round(sum(step["bytes"] for step in steps) / 1024, 1),
+            "steps": steps,
+        }
+        results.append(result)
+        print(f"{minutes:>6g} min x{args.users}  peak {result['peak_memory_mb']:8.1f} MB  "
+              f"largest state {result['largest_state_kb']:8.1f} KB  "
+              f"all steps {result['checkpointed_kb']:9.1f} KB")
+        for step in steps:
+            heavy = sorted(step["fields"].items(), key=lambda item: -item[1])[:3]
+            print(f"{'':>12}after {step['after']:<32}{step['bytes'] / 1024:9.1f} KB  "
+                  + ", ".join(f"{name} {size / 1024:.0f} KB" for name, size in heavy))
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict):
+    previous = {r["minutes"]: r for r in baseline.get("results", [])}
+    print(f"\nCompared with {baseline.get('commit')} ({baseline.get('created_at')}):")
+    for result in report["results"]:
+        old = previous.get(result["minutes"])
+        if not old:
+            continue
+        deltas = []
+        for key in ("peak_memory_mb", "largest_state_kb", "checkpointed_kb"):
+            before, after = old[key], result[key]
+            change = f"{(after - before) / before:+.0%}" if before else "n/a"
+            deltas.append(f"{key} {before:g} -> {after:g} ({change})")
+        print(f"{result['minutes']:>6g} min  " + "  ".join(deltas))
+
+
+def check(report: dict, max_peak_mb: float, max_checkpointed_kb: float) -> list:
+    """Regressions in `report`: the raw transcript kept past preprocessing, or bounds exceeded."""
+    problems = []
+    for result in report["results"]:
+        preprocessed = False
+        for step in result["steps"]:
+            preprocessed = preprocessed or "preprocessing" in step["after"].split(",")
+            if preprocessed and step["raw_transcript"]:
+                problems.append(f"{result['minutes']:g} min: raw_transcript still set after {step['after']}")
+                break
+    longest = max(report["results"], key=lambda r: r["minutes"])
+    hours = longest["minutes"] / 60
+    peak = longest["peak_memory_mb"] / longest["users"] / hours
+    checkpointed = longest["checkpointed_kb"] / hours
+    if peak > max_peak_mb:
+        problems.append(f"{longest['minutes']:g} min: peak {peak:.2f} MB per request-hour > {max_peak_mb:g}")
+    if checkpointed > max_checkpointed_kb:
+        problems.append(f"{longest['minutes']:g} min: checkpointed {checkpointed:.0f} KB per hour > {max_checkpointed_kb:g}")
+    return problems
+
+
+def main() -> int:
+    parser = build_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=4, help="Concurrent requests for different videos.")
+    parser.add_argument("--max-peak-mb-per-hour", type=float, default=MAX_PEAK_MB_PER_HOUR,
+                        help="Largest peak MB per concurrent request and hour of video.")
+    parser.add_argument("--max-checkpointed-kb-per-hour", type=float, default=MAX_CHECKPOINTED_KB_PER_HOUR,
+                        help="Largest checkpointed KB (all steps) per hour of video.")
+    parser.set_defaults(durations=DEFAULT_DURATIONS, output=os.path.join(RESULTS_DIR, "state-memory.json"))
+    args = parser.parse_args()
+    configure_env(args)
+    report = asyncio.run(run(args))
+    write_report(report, args.output)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    problems = check(report, args.max_peak_mb_per_hour, args.max_checkpointed_kb_per_hour)
+    for problem in problems:
+        print(f"FAIL {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Durable, resumable graph runs.
+
+Video runs are compiled with a SQLite checkpointer and keyed by video ID
+and summary length, so LangGraph persists the state after every node. If
+a run fails or the process dies, submitting the same video again resumes
+from the last completed node instead of starting over. Keypoint segments
+finished before the failure are stored separately, so a rerun of the
+Keypoint_Extractor only calls the model for the missing ones.
+"""
+from store import BlobStore, default_path
+import hashlib, os
+
+CHECKPOINTS = os.getenv("CHECKPOINTS", "1") != "0"
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH") or default_path("checkpoints.sqlite")
+
+
+def run_thread_id(video_id: str, summary_length: str) -> str:
+    return f"{video_id}:{summary_length}"
+
+
+def current_thread_id():
+    """Thread ID of the checkpointed run being executed, or None."""
+    try:
+        from langgraph.config import get_config
+        return get_config().get("configurable", {}).get("thread_id")
+    except Exception:
+        return None
+
+
+class SegmentProgress:
+    """Keypoint text of finished segments, per run thread and segment prompt."""
+
+    def __init__(self, path: str = None, ttl: float = 7 * 24 * 3600):
+        self.store = BlobStore(path or default_path("segments.sqlite"), "segments",
+                               max_bytes=64 * 1024 * 1024, ttl=ttl)
+
+    @staticmethod
+    def key(thread_id: str, prompt: str) -> str:
+        return f"{thread_id}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:24]}"
+
+    def get(self, thread_id: str, prompt: str):
+        return self.store.get(self.key(thread_id, prompt)) if thread_id else None
+
+    def put(self, thread_id: str, prompt: str, text: str):
+        if thread_id and text:
+            self.store.put(self.key(thread_id, prompt), text)
+
+
+def open_checkpointer():
+    """Async context manager yielding a SQLite checkpointer at CHECKPOINT_PATH."""
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    directory = os.path.dirname(CHECKPOINT_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return AsyncSqliteSaver.from_conn_string(CHECKPOINT_PATH)
@@ -0,0 +1,94 @@
+"""
+Single-flight coalescing of identical in-flight graph runs.
+
+When the same video is submitted several times while a run for it is still
+going (e.g. a link shared with a team), only the first submission runs the
+graph. Later identical submissions attach to it: they are replayed the
+events emitted so far, receive every further progress/token event, and get
+the same final state (or the same exception).
+"""
+from telemetry import METRICS
+import asyncio
+
+
+class _Flight:
+    def __init__(self, loop, owner):
+        self.loop = loop
+        self.owner = owner
+        self.events = []
+        self.subscribers = []
+        self.task = None
+
+    def emit(self, event):
+        self.events.append(event)
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber(event)
+            except Exception as e:
+                print(f"Event subscriber failed: {e}")
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time; concurrent callers share it.
+
+    The shared call runs as its own task, so a caller that goes away does
+    not cancel it for the others.
+    """
+
+    def __init__(self, name: str = "graph"):
+        self.name = name
+        self.flights = {}
+        self.stats = {"runs": 0, "coalesced": 0}
+
+    def in_flight(self) -> int:
+        return len(self.flights)
+
+    async def run(self, key, factory, on_event=None, owner=None):
+        """
+        Args:
+            key: Identity of the call, e.g. (video ID, summary length).
+            factory: Callable taking an `emit(event)` function and returning
+                the awaitable to run; events passed to `emit` reach every
+                attached caller.
+            on_event (callable | None): This caller's event callback.
+            owner: Anything identifying the caller's run (e.g. its trace);
+                callers that attach receive the owner of the shared run.
+
+        Returns:
+            tuple: (result, owner of the run that produced it, whether this
+            caller attached to another caller's run).
+        """
+        loop = asyncio.get_running_loop()
+        flight = self.flights.get(key)
+        coalesced = flight is not None and flight.loop is loop
+        if coalesced:
+            self.stats["coalesced"] += 1
+            METRICS.inc("yt_runs_coalesced_total", coalesce=self.name)
+            if on_event:
+                for event in list(flight.events):
+                    on_event(event)
+        else:
+            flight = _Flight(loop, owner)
+            self.stats["runs"] += 1
+            METRICS.inc("yt_singleflight_runs_total", coalesce=self.name)
+            # A run on another event loop cannot be awaited from this one;
+            # it keeps its slot and this call runs on its own.
+            if key not in self.flights:
+                self.flights[key] = flight
+            flight.task = loop.create_task(factory(flight.emit))
+            flight.task.add_done_callback(lambda _: self._finished(key, flight))
+        if on_event:
+            flight.subscribers.append(on_event)
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            if on_event in flight.subscribers:
+                flight.subscribers.remove(on_event)
+        return result, flight.owner, coalesced
+
+    def _finished(self, key, flight):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+        if not flight.task.cancelled():
+            flight.task.exception()  # mark retrieved when every caller went away
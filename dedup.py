@@ -0,0 +1,150 @@
+"""
+Local near-duplicate elimination for segment keypoint lists.
+
+Segments are extracted concurrently and cannot see each other, so the same
+topic often comes back from several segments with slightly different
+wording. A topic is folded into its first occurrence (keeping any new
+subtopics) before the lists are sent back to the model when both titles have
+the same content words, or when the titles share at least half of their
+words and the Jaccard similarity of the titles together with their
+subtopics reaches the threshold. Short titles differ by a single qualifier
+("Convolutional Neural Networks" vs "Neural Networks"), so the subtopics
+have to agree before such a pair counts as one topic.
+"""
+from planner import estimate_tokens
+import re
+
+TOPIC_LINE = re.compile(r"^\s?\**(?:\d+[.)]|#+)\s*(.+)$")
+BULLET = re.compile(r"^\s*(?:[-*•+]|\d+[.)]|[a-zA-Z][.)])\s+")
+WORD = re.compile(r"[a-z0-9]+")
+TITLE_OVERLAP = 0.5  # least Jaccard similarity of two different titles of one topic
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in into is it its of on or that the "
+    "this to with what why when vs using use via".split()
+)
+
+
+def terms(text: str) -> list:
+    """Lower-cased content words with a crude plural/-ing/-ed suffix strip, in order."""
+    words = []
+    for word in WORD.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        for suffix in ("ing", "ed", "s"):
+            if len(word) > len(suffix) + 2 and word.endswith(suffix):
+                word = word[: -len(suffix)]
+                break
+        words.append(word)
+    return words
+
+
+def normalize(text: str) -> frozenset:
+    """Set of the content words of `text` (see `terms`)."""
+    return frozenset(terms(text))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def parse_keypoints(text: str) -> list:
+    """
+    Parse a numbered keypoint list into [(topic, [subtopics])].
+
+    Lines that are not numbered topics are attached as subtopics of the
+    preceding topic (or become topics when no topic has been seen yet).
+    """
+    topics = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        match = TOPIC_LINE.match(line)
+        if match:
+            topics.append((match.group(1).strip(" *"), []))
+        elif topics:
+            topics[-1][1].append(BULLET.sub("", line).strip())
+        else:
+            topics.append((BULLET.sub("", line).strip(), []))
+    return topics
+
+
+def render_keypoints(topics: list) -> str:
+    lines = []
+    for i, (topic, subtopics) in enumerate(topics, 1):
+        lines.append(f"{i}. {topic}")
+        lines.extend(f"   - {sub}" for sub in subtopics)
+    return "\n".join(lines)
+
+
+def same_topic(words: frozenset, context: frozenset, entry_words: frozenset,
+               entry_context: frozenset, threshold: float) -> bool:
+    """
+    Whether a topic is a duplicate of an earlier one.
+
+    Args:
+        words, entry_words (frozenset): Content words of the two titles.
+        context, entry_context (frozenset): Content words of the titles and
+            their subtopics.
+        threshold (float): Jaccard similarity of the contexts needed when
+            the titles differ.
+    """
+    if words == entry_words:
+        return True
+    return jaccard(words, entry_words) >= TITLE_OVERLAP and jaccard(context, entry_context) >= threshold
+
+
+def dedupe_keypoints(segment_lists: list, threshold: float = 0.75):
+    """
+    Collapse near-duplicate topics and subtopics across segment lists.
+
+    Args:
+        segment_lists (list[str]): Keypoint list text per segment, in order.
+        threshold (float): Jaccard similarity at which two topics (see
+            `same_topic`) or two subtopics of one topic count as the same.
+
+    Returns:
+        tuple[list[str], dict]: The deduplicated lists (empty ones dropped)
+        and stats {'topics_in', 'topics_out', 'tokens_in', 'tokens_out',
+        'tokens_saved'}.
+    """
+    kept = []        # [topic, subtopics, subtopic word sets, topic words, first context], first-seen order
+    index = {}       # word -> indexes into `kept`, to find candidates quickly
+    per_segment = []
+    topics_in = 0
+    for text in segment_lists:
+        own = []
+        for topic, subtopics in parse_keypoints(text):
+            topics_in += 1
+            words = normalize(topic)
+            context = words.union(*map(normalize, subtopics))
+            candidates = {i for word in words for i in index.get(word, ())}
+            match = next((i for i in sorted(candidates)
+                          if same_topic(words, context, kept[i][3], kept[i][4], threshold)), None)
+            if match is None:
+                match = len(kept)
+                kept.append([topic, [], [], words, context])
+                for word in words:
+                    index.setdefault(word, []).append(match)
+                own.append(match)
+            entry = kept[match]
+            for sub in subtopics:
+                sub_words = normalize(sub)
+                if not any(jaccard(sub_words, seen) >= threshold for seen in entry[2]):
+                    entry[1].append(sub)
+                    entry[2].append(sub_words)
+        per_segment.append(own)
+
+    lists = [render_keypoints([(kept[i][0], kept[i][1]) for i in own])
+             for own in per_segment if own]
+    tokens_in = sum(estimate_tokens(text) for text in segment_lists)
+    tokens_out = sum(estimate_tokens(text) for text in lists)
+    stats = {
+        "topics_in": topics_in,
+        "topics_out": len(kept),
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "tokens_saved": max(0, tokens_in - tokens_out),
+    }
+    return lists, stats
@@ -0,0 +1,181 @@
+"""
+Hedged model calls against tail latency.
+
+A `Hedger` tracks the latency of the calls it runs. Once a call has been
+out for longer than a configurable percentile of that latency (e.g. p95),
+a duplicate request is sent to a backup (the same model or another one);
+the first success wins and the other request is cancelled. A backup that is
+a different model also serves as a fallback when the primary call fails.
+
+Hedges are extra requests, so they are capped twice: at most `max_ratio`
+of the calls may be hedged, and a hedge to the same model only goes out if
+the `scheduler` pacing that model has RPM/TPM budget for it right now. A
+same-model backup is never used as a fallback: a failed call is left to the
+caller (e.g. the scheduler's retries).
+"""
+from collections import deque
+from telemetry import METRICS
+import asyncio, math, time
+
+
+class LatencyTracker:
+    """Latencies of the last `window` calls."""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    def expected_beyond(self, seconds: float):
+        """Mean latency of the calls slower than `seconds`, or None if there were none."""
+        slower = [s for s in self.samples if s > seconds]
+        return sum(slower) / len(slower) if slower else None
+
+
+class Hedger:
+    """
+    Run calls with a percentile deadline after which a backup request races them.
+
+    Args:
+        name (str): Label in stats and metrics.
+        percentile (float): Latency percentile after which a call is hedged.
+        min_samples (int): Calls to observe before the percentile is used;
+            until then `initial_delay` is the deadline.
+        initial_delay (float): Deadline in seconds while warming up.
+        min_delay (float): Lower bound of the deadline.
+        max_ratio (float): Largest share of calls that may be hedged.
+        scheduler (RateLimitedScheduler | None): Budget a same-model hedge
+            must fit in.
+        fallback (bool): Call a backup to another model when the primary
+            call fails.
+        retried (callable | None): Predicate of primary errors that are
+            raised for the caller to retry instead of falling back (e.g.
+            quota errors of a call run by a RateLimitedScheduler).
+    """
+
+    def __init__(self, name: str, percentile: float = 0.95, min_samples: int = 20,
+                 initial_delay: float = 30.0, min_delay: float = 0.5, max_ratio: float = 0.1,
+                 scheduler=None, fallback: bool = True, retried=None):
+        self.name = name
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self.scheduler = scheduler
+        self.fallback = fallback
+        self.retried = retried
+        self.latency = LatencyTracker()
+        self.credit = 1.0
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "fallbacks": 0,
+                      "capped": 0, "seconds_saved": 0.0}
+
+    def deadline(self) -> float:
+        """Seconds after which a call is hedged."""
+        if len(self.latency) < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, self.latency.percentile(self.percentile))
+
+    def _allow_hedge(self, tokens: int, same_model: bool) -> bool:
+        if self.credit < 1:
+            return False
+        if same_model and self.scheduler is not None and not self.scheduler.try_acquire(tokens):
+            return False
+        self.credit -= 1
+        return True
+
+    def _count(self, outcome: str):
+        METRICS.inc("yt_hedged_calls_total", hedger=self.name, outcome=outcome)
+
+    async def _fall_back(self, failed, backup, same_model: bool):
+        """Result of `backup()` after the primary call failed, or the primary's error."""
+        if (backup is None or same_model or not self.fallback
+                or (self.retried and self.retried(failed.exception()))):
+            return failed.result()
+        print(f"{self.name}: primary call failed ({failed.exception()}), using the fallback.")
+        self.stats["fallbacks"] += 1
+        self._count("fallback")
+        return await backup()
+
+    async def run(self, primary, backup=None, tokens: int = 1, same_model: bool = False):
+        """
+        Await `primary()`, racing `backup()` against it once it is late.
+
+        Args:
+            primary: Zero-argument callable returning the awaitable to run.
+            backup: Zero-argument callable returning the hedge/fallback
+                awaitable, or None to run `primary` alone.
+            tokens (int): Estimated tokens of a hedge, checked against the
+                scheduler's budget.
+            same_model (bool): Whether `backup` calls the primary's model
+                again (budget-gated, never a fallback).
+
+        Returns:
+            The result of whichever call succeeded first.
+        """
+        self.stats["calls"] += 1
+        self.credit = min(2.0, self.credit + self.max_ratio)
+        started = time.perf_counter()
+        first = asyncio.ensure_future(primary())
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.deadline())
+            if done:
+                if first.exception() is None:
+                    self.latency.add(time.perf_counter() - started)
+                    return first.result()
+                return await self._fall_back(first, backup, same_model)
+            if backup is None or not self._allow_hedge(tokens, same_model):
+                if backup is not None:
+                    self.stats["capped"] += 1
+                    self._count("capped")
+                # A late call that then fails still gets the fallback.
+                await asyncio.wait(tasks)
+                if first.exception() is not None:
+                    return await self._fall_back(first, backup, same_model)
+                self.latency.add(time.perf_counter() - started)
+                return first.result()
+
+            self.stats["hedged"] += 1
+            tasks.append(asyncio.ensure_future(backup()))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.index):
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    elapsed = time.perf_counter() - started
+                    if task is first:
+                        self.latency.add(elapsed)
+                        self._count("primary_won")
+                    else:
+                        # The primary was still running: it would have taken at
+                        # least `elapsed`, estimated from the calls that did.
+                        expected = self.latency.expected_beyond(elapsed)
+                        self.latency.add(elapsed)
+                        self.stats["hedge_wins"] += 1
+                        self.stats["seconds_saved"] += max(0.0, (expected or elapsed) - elapsed)
+                        self._count("hedge_won")
+                    return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    task.add_done_callback(_consume)
+
+
+def _consume(task):
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,289 @@
+"""
+Response cache shared by the Groq (`llm`) and Gemini (`llm2`) model handles.
+
+Responses are keyed by model name, a hash of the prompt and the generation
+parameters, and kept in an in-memory LRU in front of an optional SQLite
+tier. The wrappers expose the same call surface the nodes already use, so
+`main.py` keeps calling `llm.ainvoke(...)` / `llm2.generate_content_async(...)`.
+Nodes listed in `bypass_nodes` (e.g. the chatbot) always hit the network.
+Every call, cached or not, is recorded as an "llm" span (see telemetry.py).
+The async call paths read and write the SQLite tier in a worker thread so a
+locked or slow database never blocks the event loop.
+"""
+from planner import estimate_tokens
+from store import BlobStore, TTLCache, default_path
+from telemetry import record
+import asyncio, hashlib, json, os, threading, time
+
+
+class CachedResponse:
+    """Stand-in for a model response rebuilt from the cache."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.content = text
+
+
+def current_node():
+    """Name of the LangGraph node being executed, or None outside a graph run."""
+    try:
+        from langgraph.config import get_config
+        return get_config().get("metadata", {}).get("langgraph_node")
+    except Exception:
+        return None
+
+
+class ResponseCache:
+    """
+    Two-tier response cache with hit/miss counters.
+
+    Args:
+        memory_entries (int): Size of the in-memory LRU tier.
+        store (BlobStore | None): Optional persistent tier.
+        ttl (float): Expiry of the in-memory tier in seconds.
+    """
+
+    def __init__(self, memory_entries: int = 512, store: BlobStore = None, ttl: float = 7 * 24 * 3600):
+        self.memory = TTLCache(ttl=ttl, max_entries=memory_entries)
+        self.store = store
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, prompt, params: dict = None) -> str:
+        payload = json.dumps({"model": model, "prompt": prompt, "params": params or {}},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    async def peek(self, key: str):
+        """Look a key up without touching the counters (disk tier read in a worker thread)."""
+        text = self.memory.get(key)
+        if text is None and self.store is not None:
+            text = await asyncio.to_thread(self.store.get, key)
+        return text
+
+    def get(self, key: str):
+        return self.lookup(key)[0]
+
+    def lookup(self, key: str):
+        """
+        Returns:
+            tuple[str | None, str]: The cached text and the tier that served
+            it ("memory", "disk" or "miss").
+        """
+        text = self.memory.get(key)
+        if text is not None:
+            self._count("memory_hits")
+            return text, "memory"
+        return self._stored(key, None if self.store is None else self.store.get(key))
+
+    async def alookup(self, key: str):
+        """`lookup` with the disk tier read in a worker thread."""
+        text = self.memory.get(key)
+        if text is not None:
+            self._count("memory_hits")
+            return text, "memory"
+        if self.store is None:
+            return self._stored(key, None)
+        return self._stored(key, await asyncio.to_thread(self.store.get, key))
+
+    def _stored(self, key: str, text):
+        if text is not None:
+            self.memory.set(key, text)
+            self._count("disk_hits")
+            return text, "disk"
+        self._count("misses")
+        return None, "miss"
+
+    def put(self, key: str, text: str):
+        if not text:
+            return
+        self.memory.set(key, text)
+        if self.store is not None:
+            self.store.put(key, text)
+
+    async def aput(self, key: str, text: str):
+        """`put` with the disk tier written in a worker thread."""
+        if not text:
+            return
+        self.memory.set(key, text)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.put, key, text)
+
+
+class _CachedModel:
+    def __init__(self, model, model_name: str, cache: ResponseCache = None, bypass_nodes=()):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache
+        self.bypass_nodes = set(bypass_nodes)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def _key(self, prompt, params):
+        if self.cache is None:
+            return None
+        if current_node() in self.bypass_nodes:
+            self.cache._count("bypassed")
+            return None
+        return self.cache.key(self.model_name, prompt, params)
+
+    def _lookup(self, key):
+        if key is None:
+            return None, "off"
+        return self.cache.lookup(key)
+
+    async def _alookup(self, key):
+        if key is None:
+            return None, "off"
+        return await self.cache.alookup(key)
+
+    async def is_cached(self, prompt, **params) -> bool:
+        """Whether a call with these arguments would be served from the cache."""
+        if self.cache is None or current_node() in self.bypass_nodes:
+            return False
+        return await self.cache.peek(self.cache.key(self.model_name, prompt, params)) is not None
+
+    def _record(self, started, prompt, text, tier, status="ok", **fields):
+        record("llm", self.model_name, time.perf_counter() - started, started,
+               node=current_node(), cache=tier, status=status,
+               prompt_tokens=estimate_tokens(_prompt_text(prompt)),
+               response_tokens=estimate_tokens(text or ""), **fields)
+
+    async def _observe_stream(self, response, key, tier, started, prompt):
+        parts, first_token, status = [], None, "error"
+        try:
+            async for chunk in response:
+                text = _text(chunk)
+                if text:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    parts.append(text)
+                yield chunk
+            status = "ok"
+            if key:
+                await self.cache.aput(key, "".join(parts))
+        finally:
+            self._record(started, prompt, "".join(parts), tier, status, stream=True,
+                         first_token=round(first_token, 4) if first_token is not None else None)
+
+
+class CachedGenerativeModel(_CachedModel):
+    """Cache wrapper for `google.generativeai.GenerativeModel`."""
+
+    def generate_content(self, contents, **params):
+        started = time.perf_counter()
+        key = self._key(contents, params)
+        cached, tier = self._lookup(key)
+        if cached is not None:
+            self._record(started, contents, cached, tier)
+            return CachedResponse(cached)
+        try:
+            response = self.model.generate_content(contents, **params)
+        except Exception:
+            self._record(started, contents, None, tier, "error")
+            raise
+        text = _text(response)
+        if key:
+            self.cache.put(key, text)
+        self._record(started, contents, text, tier)
+        return response
+
+    async def generate_content_async(self, contents, stream: bool = False, **params):
+        started = time.perf_counter()
+        key = self._key(contents, params)
+        cached, tier = await self._alookup(key)
+        if cached is not None:
+            if stream:
+                return self._observe_stream(_replay(cached), None, tier, started, contents)
+            self._record(started, contents, cached, tier)
+            return CachedResponse(cached)
+        try:
+            response = await self.model.generate_content_async(contents, stream=stream, **params)
+        except Exception:
+            self._record(started, contents, None, tier, "error")
+            raise
+        if stream:
+            return self._observe_stream(response, key, tier, started, contents)
+        text = _text(response)
+        if key:
+            await self.cache.aput(key, text)
+        self._record(started, contents, text, tier)
+        return response
+
+
+class CachedChatModel(_CachedModel):
+    """Cache wrapper for LangChain chat models (`invoke` / `ainvoke`)."""
+
+    def invoke(self, prompt, **params):
+        started = time.perf_counter()
+        key = self._key(_prompt_key(prompt), params)
+        cached, tier = self._lookup(key)
+        if cached is not None:
+            self._record(started, prompt, cached, tier)
+            return CachedResponse(cached)
+        try:
+            response = self.model.invoke(prompt, **params)
+        except Exception:
+            self._record(started, prompt, None, tier, "error")
+            raise
+        if key:
+            self.cache.put(key, response.content)
+        self._record(started, prompt, response.content, tier)
+        return response
+
+    async def ainvoke(self, prompt, **params):
+        started = time.perf_counter()
+        key = self._key(_prompt_key(prompt), params)
+        cached, tier = await self._alookup(key)
+        if cached is not None:
+            self._record(started, prompt, cached, tier)
+            return CachedResponse(cached)
+        try:
+            response = await self.model.ainvoke(prompt, **params)
+        except Exception:
+            self._record(started, prompt, None, tier, "error")
+            raise
+        if key:
+            await self.cache.aput(key, response.content)
+        self._record(started, prompt, response.content, tier)
+        return response
+
+
+def _text(response):
+    try:
+        return response.text
+    except (ValueError, AttributeError):
+        return None
+
+
+def _prompt_key(prompt):
+    if isinstance(prompt, str):
+        return prompt
+    return [getattr(m, "content", str(m)) for m in prompt]
+
+
+def _prompt_text(prompt) -> str:
+    key = _prompt_key(prompt) if isinstance(prompt, (str, list, tuple)) else str(prompt)
+    return key if isinstance(key, str) else "\n".join(map(str, key))
+
+
+async def _replay(text: str):
+    yield CachedResponse(text)
+
+
+def response_cache_from_env():
+    """Build the cache configured by LLM_CACHE* variables, or None if disabled."""
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+    ttl = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+    store = None
+    if os.getenv("LLM_CACHE_DISK", "1") != "0":
+        store = BlobStore(os.getenv("LLM_CACHE_PATH") or default_path("llm_cache.sqlite"), "responses",
+                          max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024, ttl=ttl)
+    return ResponseCache(int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512")), store, ttl)
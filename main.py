@@ -1,46 +1,210 @@
-# Monkey patch early to avoid POLLER crash
-try:
-    import grpc._cython.cygrpc as cygrpc
-
-    def no_op_shutdown(*args, **kwargs):
-        pass
-
-    cygrpc.shutdown_grpc_aio = no_op_shutdown
-except ImportError:
-    pass
-
 from typing import Annotated
 from typing_extensions import TypedDict
-from langgraph.graph import StateGraph, END, START
-from langgraph.graph.message import add_messages
-from langchain.chat_models import init_chat_model
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_tavily import TavilySearch
-import google.generativeai as genai
-from langchain_community.document_loaders import YoutubeLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import asyncio, os, json, re
+from planner import ModelBudget, estimate_tokens, group_by_budget, plan_segment_tokens, segment_token_cap
+from segmenter import StreamingSegmenter, segment_offsets
+from dedup import dedupe_keypoints
+from transcript_cleaner import cleaner_from_env, merge_stats
+from checkpoints import CHECKPOINTS, SegmentProgress, current_thread_id, open_checkpointer, run_thread_id
+from scheduler import RateLimitedScheduler, is_rate_limited
+from search import TopicSearcher
+from transcripts import canonical_video_id, stream_documents, transcript_cache_from_env
+from memo import stage_memo_from_env
+from writer_prompt import assemble_writer_prompt
+from retrieval import BM25Index, format_timestamp, index_store_from_env, parse_time_reference, passages_from_chunks
+from llm_cache import CachedChatModel, CachedGenerativeModel, response_cache_from_env
+from telemetry import Trace, debug, instrument_node, metrics_from_env, traced_run
+from coalesce import SingleFlight
+from hedging import Hedger
+import asyncio, math, os, re, threading, time
 
 
 from dotenv import load_dotenv
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# "analytic" (default) plans chunking locally, "llm" asks the Groq model instead.
+PLANNER_MODE = os.getenv("PLANNER_MODE", "analytic").lower()
+KEYPOINT_BUDGET = ModelBudget.from_env("GEMINI_")
 
 #--------------Main Program-------------------#
+# LangGraph, LangChain and the Gemini SDK take seconds to import, so they are
+# imported when the graph is first built or a node first needs them; models
+# and clients are created on first use by the get_* factories below.
+def add_messages(left, right):
+    """`langgraph.graph.message.add_messages`, imported on first use."""
+    from langgraph.graph.message import add_messages as merge
+    return merge(left, right)
+
+# The transcript lives in `clean_transcript` only; chunks and segments are
+# [start, end, ...] offsets into it, and the loader's Documents are dropped
+# once preprocessing has packed them.
 class State(TypedDict):
     messages: Annotated[list,add_messages]
-    raw_transcript: str
+    raw_transcript: list
     clean_transcript: str
-    segment_size: int
+    chunks: list
+    segments: list
     keypoints: str
     summary_1: str
     summary_2: str
     summary_length: str
+    video_id: str
+
+GROQ_MODEL = "groq:llama3-70b-8192"
+GEMINI_MODEL = "gemini-2.5-flash"
+# Bump when a prompt or the keypoint/summary logic changes so memoized
+# intermediate results of earlier versions are not reused.
+PIPELINE_VERSION = f"3:{GROQ_MODEL}:{GEMINI_MODEL}"
+
+# Both model handles share one response cache; nodes in LLM_CACHE_BYPASS
+# (the chatbot by default) always call the model.
+response_cache = response_cache_from_env()
+CACHE_BYPASS_NODES = [node for node in os.getenv("LLM_CACHE_BYPASS", "chatbot").split(",") if node]
+# Built by get_llm()/get_llm2() on first use; assign these to swap in fakes.
+llm = None
+llm2 = None
+YoutubeLoader = None
+_factory_lock = threading.Lock()
+
+def get_llm():
+    """Groq chat model behind the response cache, created on first use."""
+    global llm
+    with _factory_lock:
+        if llm is None:
+            from langchain.chat_models import init_chat_model
+            llm = CachedChatModel(init_chat_model(GROQ_MODEL), GROQ_MODEL, response_cache, CACHE_BYPASS_NODES)
+        return llm
+
+def get_llm2():
+    """Gemini model behind the response cache, created on first use."""
+    global llm2
+    with _factory_lock:
+        if llm2 is None:
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            llm2 = CachedGenerativeModel(genai.GenerativeModel(GEMINI_MODEL), GEMINI_MODEL,
+                                         response_cache, CACHE_BYPASS_NODES)
+        return llm2
+
+def get_youtube_loader():
+    """langchain_community's `YoutubeLoader` class, imported on first use."""
+    global YoutubeLoader
+    with _factory_lock:
+        if YoutubeLoader is None:
+            from langchain_community.document_loaders import YoutubeLoader as loader
+            YoutubeLoader = loader
+        return YoutubeLoader
+
+# Shared by every graph run in the process so concurrent runs respect one quota.
+keypoint_scheduler = RateLimitedScheduler(KEYPOINT_BUDGET, name="gemini")
+# Keypoint and writer calls still running after the HEDGE_PERCENTILE latency
+# are hedged (see hedging.py). HEDGE_TARGET=groq races the Groq model and
+# falls back to it when Gemini fails (quota errors are left to the scheduler
+# to retry); prompts too long for Groq, and every call with "same", are
+# hedged by a second Gemini request within the scheduler's budget. "off"
+# disables hedging. Segment, consolidation and writer calls differ a lot in
+# size, so each kind has its own hedger and latency percentile.
+HEDGE_TARGET = os.getenv("HEDGE_TARGET", "groq").lower()
+HEDGE_OPTIONS = {
+    "percentile": float(os.getenv("HEDGE_PERCENTILE", "0.95")),
+    "initial_delay": float(os.getenv("HEDGE_INITIAL_DELAY", "30")),
+    "max_ratio": float(os.getenv("HEDGE_MAX_RATIO", "0.1")),
+    "scheduler": keypoint_scheduler,
+    "fallback": HEDGE_TARGET == "groq",
+    "retried": is_rate_limited,
+}
+HEDGING = HEDGE_TARGET in ("groq", "same")
+segment_hedger = Hedger("segments", **HEDGE_OPTIONS) if HEDGING else None
+consolidation_hedger = Hedger("consolidation", **HEDGE_OPTIONS) if HEDGING else None
+writer_hedger = Hedger("writer", **HEDGE_OPTIONS) if HEDGING else None
+# Largest prompt hedged to the Groq model (8k context, minus the answer).
+GROQ_INPUT_TOKENS = 6000
+# Rough allowance for the numbered list each segment call returns.
+SEGMENT_OUTPUT_TOKENS = 300
+# Keypoint consolidation: "auto" tree-reduces only when the segment lists do
+# not fit in one REDUCE_TOKEN_BUDGET sized call, "tree"/"flat" force a mode.
+KEYPOINT_REDUCE = os.getenv("KEYPOINT_REDUCE", "auto").lower()
+REDUCE_TOKEN_BUDGET = int(os.getenv("REDUCE_TOKEN_BUDGET", "8000"))
+REDUCE_OUTPUT_TOKENS = 600
+# Rough allowance for the final summary written by the writer node.
+WRITER_OUTPUT_TOKENS = 1500
+# Jaccard similarity above which segment topics are merged locally before
+# consolidation; 0 disables the local dedup stage.
+KEYPOINT_DEDUP_THRESHOLD = float(os.getenv("KEYPOINT_DEDUP_THRESHOLD", "0.75"))
+# Finished keypoint segments of checkpointed runs, so a resumed run only
+# extracts the missing ones.
+segment_progress = SegmentProgress() if CHECKPOINTS else None
+# Caption noise removed before segmentation, e.g. TRANSCRIPT_CLEAN_RULES=tags,whitespace.
+transcript_cleaner = cleaner_from_env(os.getenv("TRANSCRIPT_CLEAN_RULES"))
+# Tokens each keypoint segment repeats from the end of the previous one.
+SEGMENT_OVERLAP_TOKENS = int(os.getenv("SEGMENT_OVERLAP_TOKENS", "0"))
+TRANSCRIPT_LANGUAGES = ["en", "id"]
+# Transcripts are loaded as timestamped caption chunks of this many seconds.
+TRANSCRIPT_CHUNK_SECONDS = int(os.getenv("TRANSCRIPT_CHUNK_SECONDS", "30"))
+# TRANSCRIPT_STREAMING=1 replaces transcript_loader -> preprocessing ->
+# Keypoint_Extractor with stream_extractor, which dispatches each keypoint
+# segment as soon as enough transcript has arrived. Until the transcript is
+# complete its segments are planned for STREAM_EXPECTED_MINUTES of video,
+# doubled whenever the transcript outgrows that.
+TRANSCRIPT_STREAMING = os.getenv("TRANSCRIPT_STREAMING", "0") == "1"
+STREAM_EXPECTED_MINUTES = float(os.getenv("STREAM_EXPECTED_MINUTES", "60"))
+# Caption rate assumed while the chunks carry no timestamps.
+CAPTION_CHARS_PER_SECOND = 15
+# Per-video BM25 index of the transcript for follow-up questions.
+transcript_index = index_store_from_env()
+FOLLOWUP_TOP_K = int(os.getenv("FOLLOWUP_TOP_K", "6"))
+FOLLOWUP_PASSAGE_TOKENS = int(os.getenv("FOLLOWUP_PASSAGE_TOKENS", "250"))
+transcript_cache = transcript_cache_from_env()
+stage_memo = stage_memo_from_env(PIPELINE_VERSION)
+# One pooled search client and result cache for every summary2 call.
+topic_search = TopicSearcher(
+    max_workers=int(os.getenv("SEARCH_CONCURRENCY", "4")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", str(6 * 3600))),
+)
+# Estimated token ceiling of the writer prompt (instructions + all sources).
+WRITER_INPUT_CEILING = int(os.getenv("WRITER_INPUT_CEILING", "12000"))
+# Identical video requests in flight at the same time share one graph run.
+COALESCE_RUNS = os.getenv("COALESCE_RUNS", "1") != "0"
+inflight_runs = SingleFlight()
+# Prometheus endpoint on METRICS_PORT, if configured.
+metrics_from_env()
 
-llm = init_chat_model("groq:llama3-70b-8192")
-genai.configure(api_key=GEMINI_API_KEY)
-llm2 = genai.GenerativeModel("gemini-2.5-flash")
+# Share of the overall progress bar covered by each node (start %, end %).
+PROGRESS_STAGES = {
+    "transcript_loader": (0, 10),
+    "restore_intermediates": (0, 80),
+    "preprocessing": (10, 15),
+    "Keypoint_Extractor": (15, 70),
+    "stream_extractor": (0, 70),
+    "summary1": (70, 85),
+    "summary2": (70, 85),
+    "writer": (85, 100),
+    "chatbot": (0, 100),
+    "followup": (0, 100),
+}
+
+def stream_writer():
+    """
+    The custom graph stream writer, or a no-op outside a graph run (when a
+    node is called directly, e.g. by a benchmark).
+    """
+    from langgraph.config import get_stream_writer
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda event: None
+
+def emit_progress(node: str, message: str, fraction: float = 0.0, **extra):
+    """
+    Emit a progress event for `node` on the custom graph stream.
+
+    `fraction` is how far the node itself has got (0..1); the event carries
+    the matching overall percentage.
+    """
+    write = stream_writer()
+    start, end = PROGRESS_STAGES.get(node, (0, 100))
+    percent = int(start + (end - start) * min(1.0, max(0.0, fraction)))
+    write({"type": "progress", "node": node, "message": message, "percent": percent, **extra})
 
 def hyperparameter_tuning_tool(transcript_len: int) -> dict:
     """
@@ -63,13 +227,22 @@ def hyperparameter_tuning_tool(transcript_len: int) -> dict:
         f"chunk_size: <value>\nsegment_size: <value>\n"
         f"Here is the length of the youtube transcript: {transcript_len}"
     )
-    response = llm.invoke(prompt)
-    response = llm.invoke(prompt)
+    response = get_llm().invoke(prompt)
     content = response.content  # Correct attribute!
     chunk_size = int(content.split("chunk_size:")[1].split("\n")[0].strip().replace(',', ''))
     segment_size = int(content.split("segment_size:")[1].split("\n")[0].strip().replace(',', ''))
     return {"chunk_size": chunk_size, "segment_size": segment_size}
 
+def open_loader(url: str, video_id: str = None):
+    """YoutubeLoader for the video, returning timestamped caption chunks."""
+    YoutubeLoader = get_youtube_loader()
+    from langchain_community.document_loaders.youtube import TranscriptFormat
+    options = {"add_video_info": False, "language": TRANSCRIPT_LANGUAGES,
+               "transcript_format": TranscriptFormat.CHUNKS, "chunk_size_seconds": TRANSCRIPT_CHUNK_SECONDS}
+    if video_id:
+        return YoutubeLoader(video_id, **options)
+    return YoutubeLoader.from_youtube_url(url, **options)
+
 def transcript_loader(State):
     """
     Load a YouTube transcript and split it into chunks.
@@ -79,103 +252,440 @@ def transcript_loader(State):
         url = url[-1].content 
     if not url:
         raise ValueError("No 'url' found in state for transcript_loader.")
+    emit_progress("transcript_loader", "Loading transcript...")
+    video_id = canonical_video_id(url)
+    cached = cached_transcript(video_id)
+    if cached is not None:
+        return {"raw_transcript": cached, "video_id": video_id}
     print(f"Loading transcript from URL: {url}")
-    loader = YoutubeLoader.from_youtube_url(
-    url,
-    add_video_info=False,
-    language=["en", "id"])
-
-    text_transcripts = loader.load()
+    text_transcripts = open_loader(url, video_id).load()
     #print(text_transcripts)
+    cache_transcript(video_id, text_transcripts)
     
-    return {"raw_transcript":text_transcripts}
+    return {"raw_transcript":text_transcripts, "video_id": video_id}
+
+def cached_transcript(video_id: str):
+    """The video's transcript Documents from the transcript cache, or None."""
+    if not (transcript_cache and video_id):
+        return None
+    cached = transcript_cache.get(video_id, TRANSCRIPT_LANGUAGES, TRANSCRIPT_CHUNK_SECONDS)
+    if cached is not None:
+        print(f"Transcript cache hit for video: {video_id}")
+    return cached
+
+def cache_transcript(video_id: str, documents):
+    if transcript_cache and video_id and documents:
+        transcript_cache.put(video_id, TRANSCRIPT_LANGUAGES, TRANSCRIPT_CHUNK_SECONDS, documents)
+
+def restore_intermediates(State):
+    """
+    Load memoized keypoints and summaries of an already processed video so
+    only the writer has to run for a new summary length.
+    """
+    url = State.get("messages")
+    if isinstance(url, list):
+        url = url[-1].content
+    video_id = canonical_video_id(url)
+    values = stage_memo.get(video_id) if stage_memo else None
+    if values is None:
+        return {"video_id": video_id}
+    print(f"Reusing intermediate results for video: {video_id}")
+    emit_progress("restore_intermediates", "Reusing previous analysis of this video...", 1.0)
+    return {**values, "video_id": video_id}
     
+def index_transcript(video_id: str, transcript: str, chunks: list):
+    """Build and persist the BM25 index used to answer follow-up questions."""
+    passages = passages_from_chunks(transcript, chunks, FOLLOWUP_PASSAGE_TOKENS)
+    transcript_index.put(video_id, BM25Index(passages))
+    debug(f"Indexed {len(passages)} transcript passages for follow-up questions on {video_id}.")
+
+def clean_chunk(document, chunks: list, clean_stats):
+    """
+    Strip caption noise from one chunk and append its [start, end,
+    start_seconds] in the space-joined transcript to `chunks`.
+
+    Returns:
+        tuple[str, dict]: The cleaned text ("" if nothing is left) and the
+        cleaning stats summed with `clean_stats`.
+    """
+    text, stats = transcript_cleaner.clean(document.page_content)
+    if text:
+        start = chunks[-1][1] + 1 if chunks else 0
+        chunks.append([start, start + len(text), (document.metadata or {}).get("start_seconds")])
+    return text, merge_stats(clean_stats, stats)
+
+def pack_transcript(documents):
+    """
+    Strip caption noise from each chunk and join the chunks into one buffer.
+
+    Returns:
+        tuple[str, list, dict]: The buffer, [start, end, start_seconds] of
+        every chunk in it, and the summed cleaning stats.
+    """
+    parts, chunks, clean_stats = [], [], None
+    for document in documents:
+        text, clean_stats = clean_chunk(document, chunks, clean_stats)
+        if text:
+            parts.append(text)
+    return " ".join(parts), chunks, clean_stats
+
+def print_clean_stats(clean_stats):
+    if clean_stats and clean_stats["chars_in"]:
+        reduction = 1 - clean_stats["chars_out"] / clean_stats["chars_in"]
+        print(f"Transcript cleaning: {clean_stats['chars_in']} -> {clean_stats['chars_out']} chars "
+              f"({reduction:.1%}, ~{clean_stats['tokens_saved']} tokens saved) {clean_stats['rules']}")
+
 def preprocess_transcript(State):
-    raw_transcript = State["raw_transcript"]
-    raw_transcript = "".join([t.page_content for t in raw_transcript])
-    result = hyperparameter_tuning_tool(len(raw_transcript))
-    chunk_size = result["chunk_size"]
-    segment_size = result["segment_size"]  
-    #print(f"Chunk Size: {chunk_size}, Segment Size: {segment_size}")
-    text_splitter= RecursiveCharacterTextSplitter(chunk_size=chunk_size)
-    chunks = text_splitter.split_text(raw_transcript)
-    #print(f"Number of chunks: {len(chunks)}")
-    #print(type(chunks),f"First chunk: {chunks[0:3]}")
-    return {"clean_transcript":chunks ,"segment_size": segment_size}
-
-def clean_keypoints(keypoints_str: str) :
+    """
+    Pack the transcript chunks into one cleaned buffer and plan the keypoint
+    segments as (start, end) offsets into it, sized by an estimated token
+    budget. The raw Documents are dropped from the state.
+    """
+    emit_progress("preprocessing", "Splitting transcript...")
+    raw_transcript, chunks, clean_stats = pack_transcript(State["raw_transcript"])
+    print_clean_stats(clean_stats)
+    if transcript_index and State.get("video_id"):
+        index_transcript(State["video_id"], raw_transcript, chunks)
+    if PLANNER_MODE == "llm":
+        result = hyperparameter_tuning_tool(len(raw_transcript))
+        segment_tokens = estimate_tokens(result["chunk_size"] * result["segment_size"])
+        segment_tokens = min(segment_tokens, segment_token_cap(KEYPOINT_BUDGET))
+    else:
+        segment_tokens = plan_segment_tokens(len(raw_transcript), KEYPOINT_BUDGET)
+    #print(f"Segment tokens: {segment_tokens}")
+    segments = segment_offsets(raw_transcript, segment_tokens, SEGMENT_OVERLAP_TOKENS)
+    #print(f"Number of segments: {len(segments)}")
+    return {"raw_transcript": None, "clean_transcript": raw_transcript, "chunks": chunks, "segments": segments}
+
+async def clean_keypoints(keypoints_str: str, max_topics: int = 12) :
     """Concise the keypoints further to provide a clean overview."""
     
-    final_keypoints = llm2.generate_content(contents=f"""
+    return await hedged_text(f"""
                     You are provided keypoints/topics extracted from a YouTube video transcript.
                     Your task is to de-duplicate and consolidate these keypoints into a concise list.
                     Make sure to remove any duplicates and keep the keypoints concise.
-                    Strictly make sure all topics/keypoints are covered and provide the final list (max 12 topics & 3 subtopics).
+                    Strictly make sure all topics/keypoints are covered and provide the final list (max {max_topics} topics & 3 subtopics).
                     Here are the keypoints:
-                    {keypoints_str}""")
-    return final_keypoints.text if final_keypoints else None   
+                    {keypoints_str}""", consolidation_hedger, REDUCE_OUTPUT_TOKENS)
+
+async def consolidate_keypoints(segment_keypoints_list: list):
+    """
+    Merge per-segment keypoint lists into the final list.
+
+    Near-duplicate topics are first collapsed locally (see dedup.py). In tree
+    mode the lists are then merged in groups of at most REDUCE_TOKEN_BUDGET
+    tokens, all groups of a level concurrently, until one list is left; the
+    prompt of every call stays bounded and the depth grows logarithmically.
+    """
+    level = [text for text in segment_keypoints_list if text]
+    if KEYPOINT_DEDUP_THRESHOLD > 0:
+        level, stats = dedupe_keypoints(level, KEYPOINT_DEDUP_THRESHOLD)
+        debug(f"Local dedup: {stats['topics_in']} -> {stats['topics_out']} topics, "
+              f"{stats['tokens_saved']} of {stats['tokens_in']} tokens saved.")
+    total_tokens = sum(estimate_tokens(text) for text in level)
+    tree = KEYPOINT_REDUCE == "tree" or (KEYPOINT_REDUCE == "auto" and total_tokens > REDUCE_TOKEN_BUDGET)
+    depth = 0
+    while tree and len(level) > 1 and sum(estimate_tokens(text) for text in level) > REDUCE_TOKEN_BUDGET:
+        depth += 1
+        groups = group_by_budget(level, REDUCE_TOKEN_BUDGET)
+        merge = [group for group in groups if len(group) > 1]
+        emit_progress("Keypoint_Extractor", f"Consolidating keypoints: level {depth}, {len(merge)} groups", 0.9)
+        # Intermediate levels keep more topics so the final pass still sees everything.
+        factories = [lambda g=group: clean_keypoints("\n".join(g), max_topics=20) for group in merge]
+        tokens = [estimate_tokens("\n".join(group)) + REDUCE_OUTPUT_TOKENS for group in merge]
+        merged, errors = await keypoint_scheduler.map(factories, tokens)
+        merged = iter(merged)
+        next_level = []
+        for group in groups:
+            if len(group) == 1:
+                next_level.append(group[0])
+                continue
+            result = next(merged)
+            # A failed merge keeps its inputs concatenated for the next level.
+            next_level.append(result.strip() if result else "\n".join(group))
+        for index, error in errors:
+            print(f"Keypoint merge {index + 1}/{len(merge)} at level {depth} failed: {error}")
+        level = next_level
+    if depth:
+        print(f"Consolidated {len(segment_keypoints_list)} segment lists in {depth} reduce levels.")
+    emit_progress("Keypoint_Extractor", "Consolidating keypoints...", 0.95)
+    text = "\n".join(level)
+    return await keypoint_scheduler.run(lambda: clean_keypoints(text), estimate_tokens(text) + REDUCE_OUTPUT_TOKENS)
     
+def segment_prompt(segment_text: str) -> str:
+    """Keypoint extraction prompt of one transcript segment."""
+    return f"""From the following text, extract concise, distinct topics/key-points relevant to technology, study, or important concepts.
+        Provide them as a numbered list. Focus on core factual information and avoid repetition within this segment's points.
+        MUST return only the list of topics name (maximum 5) and 2 subtopics, without any additional commentary or explanations. The topics should follow a clear logical order (sort of roadmap) and be **highly concise**.
+        CRUCIALLY do not repeat any points already extracted from previous segments. DO NOT include any introductory or concluding sentences outside the list.
+        TEXT:\n{segment_text}"""
+
+async def gemini_call_tokens(prompt: str, output_tokens: int = SEGMENT_OUTPUT_TOKENS) -> int:
+    """Scheduler estimate of one Gemini call; cached prompts cost no quota, so they are not paced."""
+    return 0 if await get_llm2().is_cached(prompt) else estimate_tokens(prompt) + output_tokens
+
+def groq_backup(prompt: str):
+    """Groq call for `prompt` to hedge or replace a Gemini call, or None if it does not fit."""
+    if estimate_tokens(prompt) > GROQ_INPUT_TOKENS:
+        return None
+    async def call():
+        response = await get_llm().ainvoke(prompt)
+        return response.content.strip()
+    return call
+
+def hedge_backup(prompt: str, gemini, groq=None):
+    """
+    Backup of a Gemini call: `groq` (or the Groq model for `prompt`) when
+    HEDGE_TARGET=groq and the prompt fits it, otherwise `gemini` again.
+
+    Returns:
+        tuple: The backup callable and whether it is the same model.
+    """
+    if HEDGE_TARGET == "groq":
+        groq = groq or groq_backup(prompt)
+        if groq is not None:
+            return groq, False
+    return gemini, True
+
+async def hedged_text(prompt: str, hedger: Hedger = None, output_tokens: int = SEGMENT_OUTPUT_TOKENS) -> str:
+    """Gemini's answer to `prompt`, hedged by / falling back to the HEDGE_TARGET backup."""
+    async def gemini():
+        response = await get_llm2().generate_content_async(prompt)
+        return response.text.strip()
+
+    if hedger is None:
+        return await gemini()
+    backup, same_model = hedge_backup(prompt, gemini)
+    return await hedger.run(gemini, backup, await gemini_call_tokens(prompt, output_tokens), same_model)
+
+async def extract_segment(prompt: str, thread_id: str = None):
+    """Keypoint list of one segment, or None if the model returned no text."""
+    try:
+        text = await hedged_text(prompt, segment_hedger)
+    except ValueError as e:
+        # Blocked or empty candidates raise on `.text`; keep the other segments.
+        print(f"Skipping segment without text: {e}")
+        return None
+    if segment_progress:
+        await asyncio.to_thread(segment_progress.put, thread_id, prompt, text)
+    return text
+
 async def keypoints(State):
     """ Extracts key points from the transcript chunks asynchronously."""
-    chunks = State.get("clean_transcript")
-    segment_size = State.get("segment_size", 30) 
-    if not chunks:
+    transcript = State.get("clean_transcript")
+    segments = State.get("segments")
+    if not transcript or not segments:
         print("Error: 'clean_transcript' not found in state or is empty.")
         return {"error_message": "No clean transcript available for keypoint extraction."}
 
-    #print(f"Starting keypoint extraction for {len(chunks)} chunks...")
+    #print(f"Starting keypoint extraction for {len(segments)} segments...")
 
-    all_keypoint_tasks = []
-    #print(f"Calculated segment size: {segment_size} chunks per LLM call.")
+    def prompt_for(i):
+        start, end = segments[i]
+        return segment_prompt(transcript[start:end])
 
-    all_keypoint_tasks = []
+    # Prompts are rebuilt when their call starts instead of being kept for
+    # the whole stage: together they would copy the entire transcript.
+    thread_id = current_thread_id()
+    segment_texts, pending, tokens = [], [], []
+    for i in range(len(segments)):
+        prompt = prompt_for(i)
+        done = await asyncio.to_thread(segment_progress.get, thread_id, prompt) if segment_progress else None
+        segment_texts.append(done)
+        if done is None:
+            pending.append(i)
+            tokens.append(await gemini_call_tokens(prompt))
+    if len(pending) < len(segments):
+        print(f"Resuming keypoint extraction: {len(segments) - len(pending)} segments already done.")
 
-    for i in range(0, len(chunks), segment_size):
-        current_segment_chunks = chunks[i : i + segment_size]
-        combined_segment_text = " ".join(current_segment_chunks)
+    factories = [lambda i=i: extract_segment(prompt_for(i), thread_id) for i in pending]
+    #print(f"Scheduling {len(factories)} LLM calls...")
+    finished = len(segments) - len(pending)
 
-        if not combined_segment_text.strip():
-            continue
+    def on_segment_done(done, total):
+        # The last tenth of the stage is left for clean_keypoints.
+        done, total = finished + done, len(segments)
+        emit_progress("Keypoint_Extractor", f"Extracting keypoints: {done}/{total} segments done",
+                      0.9 * done / total if total else 0.0, done=done, total=total)
 
-        #print(f"Preparing task for segment {i // segment_size + 1}/{math.ceil(len(chunks)/segment_size)} (length: {len(combined_segment_text)} chars)...")
+    on_segment_done(0, len(factories))
+    results, errors = await keypoint_scheduler.map(factories, tokens, on_segment_done)
+    for index, text in zip(pending, results):
+        segment_texts[index] = text
+    return await finish_keypoints(segment_texts, [(pending[index], error) for index, error in errors])
 
-        prompt = f"""From the following text, extract concise, distinct topics/key-points relevant to technology, study, or important concepts.
-        Provide them as a numbered list. Focus on core factual information and avoid repetition within this segment's points.
-        MUST return only the list of topics name (maximum 5) and 2 subtopics, without any additional commentary or explanations. The topics should follow a clear logical order (sort of roadmap) and be **highly concise**.
-        CRUCIALLY do not repeat any points already extracted from previous segments. DO NOT include any introductory or concluding sentences outside the list.
-        TEXT:\n{combined_segment_text}"""
+async def finish_keypoints(segment_texts: list, errors: list) -> dict:
+    """
+    Report the failed segments and consolidate the keypoints of the others.
 
-        
-        task = llm2.generate_content_async(prompt)
-        all_keypoint_tasks.append(task)
+    Args:
+        segment_texts (list): Keypoints of every segment, in order (None or
+            "" for the ones without).
+        errors (list): (segment index, exception) of the failed segments.
 
-    raw_responses = []
-    try:
-        #print(f"Awaiting {len(all_keypoint_tasks)} concurrent LLM calls...")
-        raw_responses = await asyncio.gather(*all_keypoint_tasks)
-        #print("All segment keypoint tasks completed.")
-    except Exception as e:
-        print(f"Error during concurrent keypoint extraction: {e}")
-        return {"error_message": f"Failed to extract key points: {e}"}
-
-    segment_keypoints_list = []
-    for j, response in enumerate(raw_responses):
-        
-        segment_keypoints_list.append(response.text.strip())
+    Returns:
+        dict: The state update, {"keypoints": ...} or {"error_message": ...}.
+    """
+    for index, error in errors:
+        print(f"Segment {index + 1}/{len(segment_texts)} failed during keypoint extraction: {error}")
+    segment_keypoints_list = [text for text in segment_texts if text]
+    if not segment_keypoints_list:
+        return {"error_message": f"Failed to extract key points: {errors[0][1] if errors else 'no segments'}"}
 
-    final_keypoints_str = "\n".join(segment_keypoints_list)
-    keypoints = clean_keypoints(final_keypoints_str)
+    keypoints = await consolidate_keypoints(segment_keypoints_list)
     if keypoints is None:
         return {"error_message": "Failed to clean keypoints. Please check the input data."}
 
     return {"keypoints": keypoints}
-def summary1(State):
+async def transcript_stream(url: str, video_id: str, cached=None):
+    """Transcript Documents as the loader produces them, or the `cached` ones."""
+    if cached is not None:
+        for document in cached:
+            yield document
+        return
+    print(f"Streaming transcript from URL: {url}")
+    # Only kept when they are going to be cached.
+    documents = [] if transcript_cache and video_id else None
+    async for document in stream_documents(open_loader(url, video_id)):
+        if documents is not None:
+            documents.append(document)
+        yield document
+    if documents:
+        await asyncio.to_thread(cache_transcript, video_id, documents)
+
+def stream_length_estimate(length: int, seconds, estimate: int = 0) -> int:
+    """
+    Expected length in characters of a transcript that is still arriving.
+
+    Args:
+        length (int): Characters received so far.
+        seconds (float | None): Video time they cover, from the caption
+            timestamps.
+        estimate (int): The previous estimate; it never shrinks.
+
+    Returns:
+        int: STREAM_EXPECTED_MINUTES of captions at the rate seen so far,
+        doubled until it exceeds `length`.
+    """
+    rate = length / seconds if seconds else CAPTION_CHARS_PER_SECOND
+    estimate = max(estimate, int(rate * STREAM_EXPECTED_MINUTES * 60), 1)
+    while estimate < length:
+        estimate *= 2
+    return estimate
+
+def stream_segment_tokens(estimate: int, pending: int, calls: int) -> int:
+    """
+    Token budget of the next streamed segments.
+
+    Segments are planned like the staged path's for the `estimate`d
+    transcript length, but the `pending` characters are cut into at most
+    `calls` segments (the requests the rate limit allows right now), or
+    keep growing up to the per-call cap while it allows none: a small
+    segment queued behind the rate limit only adds a call.
+    """
+    cap = segment_token_cap(KEYPOINT_BUDGET)
+    if calls < 1:
+        return cap
+    return min(cap, max(plan_segment_tokens(estimate, KEYPOINT_BUDGET),
+                        math.ceil(estimate_tokens(pending) / calls)))
+
+async def stream_extractor(State):
+    """
+    Streaming transcript_loader -> preprocessing -> Keypoint_Extractor.
+
+    Caption chunks flow from the loader through the cleaner into an
+    incremental segmenter, and each keypoint segment is scheduled as soon as
+    it is full, so fetching, splitting and model latency overlap. Segments
+    are sized by stream_segment_tokens, as the transcript length is only
+    known at the end (or up front on a transcript cache hit). Writes the same
+    state as the staged nodes.
+    """
+    url = State.get("messages")
+    if isinstance(url, list):
+        url = url[-1].content
+    if not url:
+        raise ValueError("No 'url' found in state for stream_extractor.")
+    emit_progress("stream_extractor", "Loading transcript...")
+    video_id = canonical_video_id(url)
+    thread_id = current_thread_id()
+    cached = await asyncio.to_thread(cached_transcript, video_id)
+    estimate = sum(len(document.page_content) for document in cached) if cached is not None else 0
+    segmenter = StreamingSegmenter(segment_token_cap(KEYPOINT_BUDGET), SEGMENT_OVERLAP_TOKENS)
+    chunks, tasks, clean_stats = [], [], None
+    finished = 0
+    loading = True
+    started = time.monotonic()
+
+    def resize(pending):
+        # Requests the RPM budget has granted since the start (it starts full).
+        rpm = KEYPOINT_BUDGET.rpm
+        calls = int(rpm + rpm * (time.monotonic() - started) / 60) - len(tasks)
+        segmenter.resize(stream_segment_tokens(estimate, pending, calls))
+
+    def on_segment_done(_):
+        nonlocal finished
+        finished += 1
+        # The total is only known once loading is done; the last tenth is left for consolidation.
+        fraction = 0.0 if loading else 0.9 * finished / len(tasks)
+        emit_progress("stream_extractor", f"Extracting keypoints: {finished}/{len(tasks)} segments done"
+                      + (" (still loading)" if loading else ""), fraction, done=finished, total=len(tasks))
+
+    async def extract(prompt):
+        done = await asyncio.to_thread(segment_progress.get, thread_id, prompt) if segment_progress else None
+        if done is not None:
+            return done
+        return await keypoint_scheduler.run(lambda: extract_segment(prompt, thread_id),
+                                            await gemini_call_tokens(prompt))
+
+    def dispatch(segment_text):
+        task = asyncio.ensure_future(extract(segment_prompt(segment_text)))
+        tasks.append(task)
+        task.add_done_callback(on_segment_done)
+
+    try:
+        async for document in transcript_stream(url, video_id, cached):
+            text, clean_stats = clean_chunk(document, chunks, clean_stats)
+            if not text:
+                continue
+            if cached is None:
+                seconds = (document.metadata or {}).get("start_seconds")
+                estimate = stream_length_estimate(segmenter.length + len(text) + 1,
+                                                  seconds + TRANSCRIPT_CHUNK_SECONDS if seconds is not None else None,
+                                                  estimate)
+            resize(segmenter.pending_length + len(text))
+            for segment_text in segmenter.feed(text):
+                dispatch(segment_text)
+        estimate = segmenter.length
+        resize(segmenter.pending_length)
+        for segment_text in segmenter.finish():
+            dispatch(segment_text)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    loading = False
+    print_clean_stats(clean_stats)
+    print(f"Streamed {len(chunks)} transcript chunks into {len(tasks)} segments.")
+    transcript = segmenter.text
+    if transcript_index and video_id:
+        # Indexed in a worker thread while the last segment calls are out.
+        await asyncio.gather(asyncio.to_thread(index_transcript, video_id, transcript, chunks),
+                             *tasks, return_exceptions=True)
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    segment_texts = [None if isinstance(outcome, BaseException) else outcome for outcome in outcomes]
+    errors = [(i, outcome) for i, outcome in enumerate(outcomes) if isinstance(outcome, BaseException)]
+    state = {"clean_transcript": transcript, "chunks": chunks, "segments": segmenter.offsets,
+             "video_id": video_id}
+    return {**state, **await finish_keypoints(segment_texts, errors)}
+
+async def summary1(State):
     """
     Provide information on the topics based on keypoints based on LLM knowledgebase.
     """
     topics = State.get("keypoints")
+    emit_progress("summary1", "Explaining topics...")
     
-    summary_str= llm.invoke(f"""
+    summary_str= await get_llm().ainvoke(f"""
                 You are an expert librarian who knows everything.
                 Your task is to explain those topics regareding. Which will help in understanding the topic better.
                 Strictly do not include any introductory or concluding sentences outside the list.
@@ -183,7 +693,7 @@ def summary1(State):
                 Here are the topics/keypoints: {topics}.""")
     return {"summary_1": summary_str.content if summary_str else None}
 
-def summary2(State):
+async def summary2(State):
     """
     Provide information on the topics based on keypoints using TavilySearch, following best practices.
     """
@@ -200,64 +710,73 @@ def summary2(State):
     else:
         topic_lines = []
 
-    search_tool = TavilySearch(max_results=3)
-    results = []
-
-    for topic in topic_lines:
-        response = search_tool.invoke({"query": topic})
-        if isinstance(response, dict) and "results" in response:
-            raw_results = response["results"]
-        elif response and hasattr(response, "results"):
-            raw_results = response.results
-        elif isinstance(response, list):
-            raw_results = response
-        elif hasattr(response, "content"):
-            try:
-                raw_results = json.loads(response.content)
-            except Exception:
-                raw_results = []
-        else:
-            raw_results = []
-
-        for item in raw_results:
-            info = item.get("snippet") or item.get("content") or ""
-            url = item.get("url") or ""
-            if info and url:
-                results.append({
-                    "keypoint": topic,
-                    "information": info,
-                    "url": url
-                })
+    emit_progress("summary2", f"Searching the web for {len(topic_lines)} topics...")
+    results = await topic_search.asearch_many(topic_lines)
 
     return {"summary_2": results if results else None}
 
-def writer(State):
+def chunk_text(chunk):
+    try:
+        return chunk.text
+    except ValueError:
+        return None
+
+async def no_chunks():
+    return
+    yield
+
+async def stream_generate(prompt: str, node: str, hedger: Hedger = None, backup_prompt: str = None,
+                          output_tokens: int = SEGMENT_OUTPUT_TOKENS) -> str:
     """
-    Based on the provided information, judge and find the best suited summary for the youtube video.
+    Generate with Gemini in streaming mode, forwarding every text chunk as a
+    custom graph stream event and reporting the time to first token.
+
+    Opening the stream (up to its first token) is paced and retried by
+    keypoint_scheduler, which shares the Gemini quota with the other nodes.
+    With a `hedger`, a stream whose first token is late is raced by a backup
+    (see hedge_backup); a Groq backup answers `backup_prompt` in one piece.
+
+    Returns:
+        str: The full generated text.
     """
-    user_length = State.get("summary_length", "medium")
-    
-    summary1 = State.get("summary_1")
-    summary2 = State.get("summary_2")
-    topics = State.get("keypoints") 
-    print("🎯 writer node triggered")
-    print("📝 summary_1:", State.get("summary_1"))
-    print("📝 summary_2:", State.get("summary_2"))
-    print("📝 keypoints:", State.get("keypoints"))
-    print("📏 length:", State.get("summary_length"))
-    # print(f"Summary 1: {summary1}")
-    # print(f"Summary 2: {summary2}")
-    
-    if isinstance(summary2, list):
-        summary2_str = ""
-        for idx, item in enumerate(summary2, 1):
-            info = item.get("information", "")
-            url = item.get("url", "")
-            summary2_str += f"- Keypoint{idx}\n- Information/Summary{idx}: {info}\n- URL Information/Summary{idx}: {url}\n"
+    emit = stream_writer()
+    start = time.perf_counter()
+
+    async def open_stream():
+        # Waits for the first text chunk, so the race is on time to first token.
+        chunks = (await get_llm2().generate_content_async(prompt, stream=True)).__aiter__()
+        async for chunk in chunks:
+            text = chunk_text(chunk)
+            if text:
+                return text, chunks
+        return "", chunks
+
+    tokens = await gemini_call_tokens(prompt, output_tokens)
+    if hedger is None:
+        first, chunks = await keypoint_scheduler.run(open_stream, tokens)
     else:
-        summary2_str = str(summary2) if summary2 else ""
-    if summary1 and summary2:
-        prompt = f"""
+        groq = groq_backup(backup_prompt or prompt) if HEDGE_TARGET == "groq" else None
+
+        async def groq_stream():
+            return await groq(), no_chunks()
+
+        backup, same_model = hedge_backup(prompt, open_stream, groq_stream if groq else None)
+        first, chunks = await keypoint_scheduler.run(
+            lambda: hedger.run(open_stream, backup, estimate_tokens(prompt) + output_tokens, same_model), tokens)
+    parts = []
+    if first:
+        emit({"type": "first_token", "node": node, "seconds": time.perf_counter() - start})
+        parts.append(first)
+        emit({"type": "token", "node": node, "text": first})
+    async for chunk in chunks:
+        text = chunk_text(chunk)
+        if text is None:
+            continue
+        parts.append(text)
+        emit({"type": "token", "node": node, "text": text})
+    return "".join(parts)
+
+WRITER_PROMPT = """
         You are provided with two summaries of a YouTube video. Your task is to stitch the summaries and keypoints/topics together and explain those topics/keypoints with the help of the summaries.
         Make sure to keep the length of the summary {user_length}. Cover all the keypoints/topics in the summary.
         Importantly, do not repeat any information from the summaries or keypoints/topics and STRICTLY cover all the topics and subtopics.
@@ -270,66 +789,289 @@ def writer(State):
         In the end , provide a concise summary of the whole video in 2-3 lines.
         Here are the summaries:
         Summary 1: {summary1}
-        Summary 2: {summary2}
+        Summary 2 (web sources per keypoint):
+{summary2}
         Keypoints/Topics: {topics}"""
-        response = llm2.generate_content(prompt)
+
+async def writer(State):
+    """
+    Based on the provided information, judge and find the best suited summary for the youtube video.
+    """
+    user_length = State.get("summary_length", "medium")
+    
+    summary1 = State.get("summary_1")
+    summary2 = State.get("summary_2")
+    topics = State.get("keypoints") 
+    emit_progress("writer", "Writing the final summary...")
+    debug("🎯 writer node triggered")
+    debug("📝 summary_1:", State.get("summary_1"))
+    debug("📝 summary_2:", State.get("summary_2"))
+    debug("📝 keypoints:", State.get("keypoints"))
+    debug("📏 length:", State.get("summary_length"))
+    
+    if summary1 and summary2:
+        if stage_memo:
+            await asyncio.to_thread(stage_memo.put, State.get("video_id"), State)
+        prompt, budget = assemble_writer_prompt(WRITER_PROMPT, summary1, summary2, topics,
+                                                user_length, WRITER_INPUT_CEILING)
+        split = ", ".join(f"{name} {s['used']}/{s['need']}" for name, s in budget["sources"].items())
+        debug(f"Writer prompt ({user_length}): {budget['prompt_tokens']} of {budget['ceiling']} tokens; "
+              f"sources used/needed: {split}")
+        backup_prompt = None
+        if HEDGE_TARGET == "groq":
+            # The same sources, budgeted for the Groq model's smaller context.
+            backup_prompt, _ = assemble_writer_prompt(WRITER_PROMPT, summary1, summary2, topics, user_length,
+                                                      min(WRITER_INPUT_CEILING, GROQ_INPUT_TOKENS))
+        response = await stream_generate(prompt, "writer", writer_hedger, backup_prompt, WRITER_OUTPUT_TOKENS)
         if response:
-            return {"messages": [AIMessage(content=response.text)]}
+            from langchain_core.messages import AIMessage
+            return {"messages": [AIMessage(content=response)]}
         else:
             return {"error_message": "Failed to generate summary comparison."}
         
     else:
         return {"error_message": "One or both summaries are missing. Cannot compare."}
     
-def chatbot(State):
+async def chatbot(State):
     """Simple Chatbot"""
     input_text = State.get("messages")
     if isinstance(input_text, list):
         input_text = input_text[-1].content
-    response = llm2.generate_content(contents=f"""
+    emit_progress("chatbot", "Thinking...")
+    response = await stream_generate(f"""
                 You are a helpful Teacher.
                 Your task is to answer the user's question.
                 Make sure to provide a concise and accurate response related to Studies and knowledge.
                 Strictly stick to Studies and knowledge that are helpful to any student while keeping the previous inputs in memory.
-                Here is the input: {input_text}""")
-    return {"messages": response.text if response else "No response generated."}
+                Here is the input: {input_text}""", "chatbot")
+    return {"messages": response if response else "No response generated."}
+
+async def followup(State):
+    """Answer a question about an already processed video from its top-k transcript passages."""
+    question = State.get("messages")
+    if isinstance(question, list):
+        question = question[-1].content
+    video_id = State.get("video_id")
+    emit_progress("followup", "Searching the video transcript...")
+    index = await asyncio.to_thread(transcript_index.get, video_id)
+    passages = index.search(question, FOLLOWUP_TOP_K, parse_time_reference(question))
+    excerpts = "\n\n".join(f"[{format_timestamp(p['start'])}] {p['text']}" for p in passages)
+    debug(f"Follow-up on {video_id}: {len(passages)} of {len(index.passages)} passages, "
+          f"~{estimate_tokens(excerpts)} tokens")
+    emit_progress("followup", "Answering from the transcript...", 0.2)
+    response = await stream_generate(f"""
+                You are a helpful Teacher answering a question about a YouTube video.
+                Answer only from the transcript excerpts below; each starts with the [time] it is spoken at in the video.
+                Mention the times your answer is based on. If the excerpts do not contain the answer, say so.
+                Transcript excerpts:
+                {excerpts}
+
+                Question: {question}""", "followup")
+    from langchain_core.messages import AIMessage
+    return {"messages": [AIMessage(content=response or "No response generated.")]}
+
+def transcript_route() -> str:
+    """First node of a video that has to be processed: staged or streaming."""
+    return "stream_extractor" if TRANSCRIPT_STREAMING else "transcript_loader"
+
+YOUTUBE_PATTERN = r"(https?://)?(www\.)?(youtube\.com|youtu\.be)/"
 
 def start_router(State):
+    """
+    First route of a request. Kept synchronous: LangGraph runs it in a worker
+    thread, so its SQLite lookups do not block the event loop.
+    """
     user_input = State.get("messages")
     if isinstance(user_input, list):
         user_input = user_input[-1].content
     #print("DEBUG: user_input =", repr(user_input))
-    youtube_pattern = r"(https?://)?(www\.)?(youtube\.com|youtu\.be)/"
-    if user_input and re.search(youtube_pattern, user_input):
+    if user_input and re.search(YOUTUBE_PATTERN, user_input):
         #print("DEBUG: Routing to loader")
-        return "transcript_loader"
+        if stage_memo and stage_memo.get(canonical_video_id(user_input)):
+            return "restore_intermediates"
+        return transcript_route()
+    elif transcript_index and transcript_index.get(State.get("video_id")):
+        # A question about the video processed before (passed as `video_id`).
+        return "followup"
     else:
         #print("DEBUG: Routing to chatbot")
         return "chatbot"
 
-graph_builder=StateGraph(State)
-#nodes
-graph_builder.add_node("chatbot",chatbot)
-graph_builder.add_node("transcript_loader", transcript_loader)
-graph_builder.add_node("preprocessing", preprocess_transcript)
-graph_builder.add_node("Keypoint_Extractor",keypoints)
-graph_builder.add_node("writer", writer)
-graph_builder.add_node("summary1", summary1)
-graph_builder.add_node("summary2", summary2)
-#edges
-graph_builder.add_conditional_edges(START, start_router, {
-    "transcript_loader": "transcript_loader",
-    "chatbot": "chatbot"
-})
-graph_builder.add_edge("transcript_loader","preprocessing")
-graph_builder.add_edge("preprocessing","Keypoint_Extractor")
-graph_builder.add_edge("Keypoint_Extractor", "summary1")
-graph_builder.add_edge("Keypoint_Extractor", "summary2")
-graph_builder.add_edge("summary1", "writer")
-graph_builder.add_edge("summary2", "writer")
-graph_builder.add_edge("writer", END)
-graph_builder.add_edge("chatbot", END)
-graph=graph_builder.compile()
+_graph_builder = None
+_graph = None
+
+def get_graph_builder():
+    """The uncompiled StateGraph, built (and LangGraph imported) on first use."""
+    global _graph_builder
+    with _factory_lock:
+        if _graph_builder is None:
+            _graph_builder = build_graph()
+        return _graph_builder
+
+def get_graph():
+    """The graph compiled without a checkpointer, compiled on first use."""
+    global _graph
+    builder = get_graph_builder()
+    with _factory_lock:
+        if _graph is None:
+            _graph = builder.compile()
+        return _graph
+
+def __getattr__(name):
+    # `main.graph` / `main.graph_builder` keep working without an import-time compile.
+    if name == "graph":
+        return get_graph()
+    if name == "graph_builder":
+        return get_graph_builder()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def build_graph():
+    """Build the summarizer StateGraph (uncompiled)."""
+    from langgraph.graph import StateGraph, END, START
+    graph_builder=StateGraph(State)
+    #nodes
+    graph_builder.add_node("chatbot", instrument_node("chatbot", chatbot))
+    graph_builder.add_node("transcript_loader", instrument_node("transcript_loader", transcript_loader))
+    graph_builder.add_node("preprocessing", instrument_node("preprocessing", preprocess_transcript))
+    graph_builder.add_node("Keypoint_Extractor", instrument_node("Keypoint_Extractor", keypoints))
+    graph_builder.add_node("writer", instrument_node("writer", writer))
+    graph_builder.add_node("summary1", instrument_node("summary1", summary1))
+    graph_builder.add_node("summary2", instrument_node("summary2", summary2))
+    graph_builder.add_node("restore_intermediates", instrument_node("restore_intermediates", restore_intermediates))
+    graph_builder.add_node("followup", instrument_node("followup", followup))
+    graph_builder.add_node("stream_extractor", instrument_node("stream_extractor", stream_extractor))
+    #edges
+    graph_builder.add_conditional_edges(START, start_router, {
+        "transcript_loader": "transcript_loader",
+        "stream_extractor": "stream_extractor",
+        "restore_intermediates": "restore_intermediates",
+        "followup": "followup",
+        "chatbot": "chatbot"
+    })
+    graph_builder.add_conditional_edges(
+        "restore_intermediates",
+        lambda State: "writer" if State.get("summary_1") else transcript_route(),
+        {"writer": "writer", "transcript_loader": "transcript_loader", "stream_extractor": "stream_extractor"},
+    )
+    graph_builder.add_edge("transcript_loader","preprocessing")
+    graph_builder.add_edge("preprocessing","Keypoint_Extractor")
+    graph_builder.add_edge("Keypoint_Extractor", "summary1")
+    graph_builder.add_edge("Keypoint_Extractor", "summary2")
+    graph_builder.add_edge("stream_extractor", "summary1")
+    graph_builder.add_edge("stream_extractor", "summary2")
+    graph_builder.add_edge("summary1", "writer")
+    graph_builder.add_edge("summary2", "writer")
+    graph_builder.add_edge("writer", END)
+    graph_builder.add_edge("chatbot", END)
+    graph_builder.add_edge("followup", END)
+    return graph_builder
+
+async def _stream(compiled, inputs, config, on_event):
+    final_state = None
+    async for mode, chunk in compiled.astream(inputs, config, stream_mode=["custom", "values"]):
+        if mode == "custom":
+            if on_event:
+                on_event(chunk)
+        else:
+            final_state = chunk
+    return final_state
+
+async def run_graph(inputs: dict, on_event=None, trace: Trace = None) -> dict:
+    """
+    Run the graph through LangGraph streaming.
+
+    Video runs are checkpointed after every node (see checkpoints.py): if
+    the previous run for the same video and summary length did not finish,
+    it is resumed from the last completed node instead of starting over.
+    A request for a video and summary length that is already being run
+    attaches to that run instead of starting another (see coalesce.py).
+
+    Args:
+        inputs (dict): Initial state.
+        on_event (callable | None): Called with every custom event emitted by
+            the nodes, e.g. {"type": "token", "node": "writer", "text": ...}.
+        trace (Trace | None): Filled with the node, model, scheduler and
+            search spans of this run (see telemetry.py).
+
+    Returns:
+        dict: The final state.
+    """
+    with traced_run(trace) as trace:
+        video_id = run_video_id(inputs)
+        if not COALESCE_RUNS or not video_id:
+            return await _run_graph(inputs, video_id, on_event)
+        key = (video_id, inputs.get("summary_length", "medium"))
+        state, owner, coalesced = await inflight_runs.run(
+            key, lambda emit: _run_graph(inputs, video_id, emit), on_event, trace)
+        if coalesced:
+            print(f"Attached to the in-flight run for {video_id}.")
+            trace.attach(owner)
+        return state
+
+def run_video_id(inputs: dict):
+    """Canonical video ID of a video request, or None for questions."""
+    user_input = inputs.get("messages")
+    if isinstance(user_input, list):
+        user_input = user_input[-1].content
+    # Not start_router: its memo and index lookups would hit SQLite on the event loop.
+    if not user_input or not re.search(YOUTUBE_PATTERN, user_input):
+        return None
+    return canonical_video_id(user_input)
+
+async def _run_graph(inputs: dict, video_id, on_event=None) -> dict:
+    if not CHECKPOINTS or not video_id:
+        return await _stream(get_graph(), inputs, None, on_event)
+
+    thread_id = run_thread_id(video_id, inputs.get("summary_length", "medium"))
+    config = {"configurable": {"thread_id": thread_id}}
+    async with open_checkpointer() as checkpointer:
+        compiled = get_graph_builder().compile(checkpointer=checkpointer)
+        snapshot = await compiled.aget_state(config)
+        if snapshot.next:
+            print(f"Resuming interrupted run {thread_id} at: {', '.join(snapshot.next)}")
+            if on_event:
+                on_event({"type": "progress", "node": snapshot.next[0], "percent": 0,
+                          "message": f"Resuming previous run at {', '.join(snapshot.next)}..."})
+            inputs = None
+        elif snapshot.values:
+            # The last run for this thread completed; start a clean one.
+            await checkpointer.adelete_thread(thread_id)
+        final_state = await _stream(compiled, inputs, config, on_event)
+        await checkpointer.adelete_thread(thread_id)
+    return final_state
+
+async def ask(userinput: str, summary_length: str, video_id: str = None) -> dict:
+    """Run one request from the CLI, streaming progress and tokens to stdout."""
+    from langchain_core.messages import HumanMessage
+    start = time.perf_counter()
+    first_token = None
+
+    def on_event(event):
+        nonlocal first_token
+        if event.get("type") == "progress" and first_token is None:
+            print(f"[{event['percent']:3d}%] {event['message']}")
+        if event.get("type") != "token":
+            return
+        if first_token is None:
+            first_token = time.perf_counter() - start
+            print("Final Response:")
+        print(event["text"], end="", flush=True)
+
+    inputs = {"messages": [HumanMessage(content=userinput)], "summary_length": summary_length}
+    if video_id:
+        inputs["video_id"] = video_id
+    trace = Trace()
+    response_state = await run_graph(inputs, on_event, trace)
+    if first_token is None:
+        output = response_state["messages"][-1].content if "messages" in response_state else "No final output found."
+        print("Final Response:")
+        print(output)
+    else:
+        print()
+        print(f"Time to first token: {first_token:.2f}s (total {time.perf_counter() - start:.2f}s)")
+    timings = ", ".join(f"{node} {seconds:.2f}s" for node, seconds in trace.summary()["nodes"].items())
+    print(f"Node timings: {timings}")
+    return response_state
 
 async def main():
     userinput = input("Enter the youtube video URL or your question: ")
@@ -337,10 +1079,14 @@ async def main():
     if summary_length not in ["short", "medium", "long"]:
         print("Invalid summary length. Defaulting to 'medium'.")
         summary_length = "medium"
-    response_state = await graph.ainvoke({"messages": [HumanMessage(content=userinput)],"summary_length": summary_length})
-    output = response_state["messages"][-1].content if "messages" in response_state else "No final output found."
-    print("Final Response:")
-    print(output)
+    response_state = await ask(userinput, summary_length)
+    video_id = (response_state or {}).get("video_id")
+    # Follow-up questions about the video are answered from its transcript index.
+    while video_id and transcript_index:
+        question = input("\nAsk a follow-up question about the video (empty to quit): ").strip()
+        if not question:
+            break
+        await ask(question, summary_length, video_id)
     await asyncio.sleep(0.2)
 
 
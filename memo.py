@@ -0,0 +1,56 @@
+"""
+Per-video memoization of the expensive intermediate results.
+
+`keypoints`, `summary_1` and `summary_2` do not depend on the requested
+summary length, so once a video has been processed a request with a
+different length only needs the writer. Entries are keyed by the pipeline
+version, so changing a prompt or a model invalidates them.
+"""
+from store import BlobStore, default_path
+import os
+
+MEMO_FIELDS = ("keypoints", "summary_1", "summary_2")
+
+
+class StageMemo:
+    """
+    Stored intermediate results per (video ID, pipeline version).
+
+    Args:
+        version (str): Pipeline/prompt version; bump it when prompts change.
+        path (str | None): SQLite file, defaults to the shared cache dir.
+        ttl (float | None): Seconds before an entry is recomputed.
+    """
+
+    def __init__(self, version: str, path: str = None, ttl: float = None,
+                 max_bytes: int = 128 * 1024 * 1024):
+        self.version = version
+        self.store = BlobStore(path or default_path("intermediates.sqlite"), "intermediates",
+                               max_bytes=max_bytes, ttl=ttl)
+
+    def key(self, video_id: str) -> str:
+        return f"{video_id}:{self.version}"
+
+    def get(self, video_id: str):
+        """Return {keypoints, summary_1, summary_2} or None if not all are stored."""
+        if not video_id:
+            return None
+        values = self.store.get(self.key(video_id))
+        if not values or not all(values.get(field) for field in MEMO_FIELDS):
+            return None
+        return values
+
+    def put(self, video_id: str, state):
+        """Store the intermediate fields of a state if they are all present."""
+        values = {field: state.get(field) for field in MEMO_FIELDS}
+        if video_id and all(values.values()):
+            self.store.put(self.key(video_id), values)
+
+
+def stage_memo_from_env(version: str):
+    """Build the memo configured by INTERMEDIATE_CACHE* variables, or None if disabled."""
+    if os.getenv("INTERMEDIATE_CACHE", "1") == "0":
+        return None
+    ttl = os.getenv("INTERMEDIATE_CACHE_TTL")
+    return StageMemo(version, path=os.getenv("INTERMEDIATE_CACHE_PATH"),
+                     ttl=float(ttl) if ttl else None)
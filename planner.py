@@ -0,0 +1,141 @@
+"""
+Deterministic chunk/segment planner for the keypoint extraction stage.
+
+Replaces the LLM round-trips of `main.hyperparameter_tuning_tool` with a
+closed-form calculation based on the transcript length and the model budget.
+"""
+from dataclasses import dataclass
+import math, os
+
+# Rough English average for Gemini/Llama tokenizers.
+CHARS_PER_TOKEN = 4
+
+
+@dataclass(frozen=True)
+class ModelBudget:
+    """Rate and context limits of the model used for keypoint extraction."""
+    rpm: int = 5
+    tpm: int = 200_000
+    input_token_limit: int = 1_000_000
+    output_token_limit: int = 64_000
+    target_concurrency: int = 5
+    prompt_overhead_tokens: int = 250
+    max_segment_tokens: int = 32_000
+    min_segment_tokens: int = 1_500
+
+    @classmethod
+    def from_env(cls, prefix: str = "GEMINI_") -> "ModelBudget":
+        """Build a budget from environment variables, e.g. GEMINI_RPM=10."""
+        values = {}
+        for field in cls.__dataclass_fields__:
+            raw = os.getenv(prefix + field.upper())
+            if raw:
+                values[field] = int(raw)
+        return cls(**values)
+
+
+GEMINI_FLASH_BUDGET = ModelBudget()
+
+
+def estimate_tokens(text) -> int:
+    """
+    Estimate the number of tokens in a text.
+
+    Args:
+        text (str | int): The text itself or its length in characters.
+
+    Returns:
+        int: Estimated token count.
+    """
+    length = text if isinstance(text, int) else len(text)
+    return math.ceil(length / CHARS_PER_TOKEN)
+
+
+def segment_token_cap(budget: ModelBudget) -> int:
+    """Largest segment (in tokens) a single extraction call may carry."""
+    return max(1, min(
+        budget.max_segment_tokens,
+        budget.input_token_limit - budget.prompt_overhead_tokens,
+        budget.tpm - budget.prompt_overhead_tokens,
+    ))
+
+
+def plan_segment_count(transcript_len: int, budget: ModelBudget = GEMINI_FLASH_BUDGET) -> int:
+    """
+    Number of extraction segments for a transcript.
+
+    As many segments as the budget allows to run concurrently (never smaller
+    than `min_segment_tokens`), and never larger than one call can hold.
+    """
+    total_tokens = max(1, estimate_tokens(transcript_len))
+    min_segments = math.ceil(total_tokens / segment_token_cap(budget))
+    parallel_segments = min(budget.target_concurrency,
+                            math.ceil(total_tokens / budget.min_segment_tokens))
+    return max(1, min_segments, parallel_segments)
+
+
+def plan_segment_tokens(transcript_len: int, budget: ModelBudget = GEMINI_FLASH_BUDGET) -> int:
+    """
+    Token budget of one extraction segment for the token-budget segmenter.
+
+    Args:
+        transcript_len (int): Length of the youtube transcript in characters.
+        budget (ModelBudget): Limits of the extraction model.
+
+    Returns:
+        int: Estimated tokens per segment.
+    """
+    total_tokens = max(1, estimate_tokens(transcript_len))
+    return math.ceil(total_tokens / plan_segment_count(transcript_len, budget))
+
+
+def plan_chunking(transcript_len: int, budget: ModelBudget = GEMINI_FLASH_BUDGET,
+                  chunks_per_segment: int = 30) -> dict:
+    """
+    Find the chunk_size and segment_size for the text splitter and keypoint extraction.
+
+    The transcript is divided into `plan_segment_count` segments, each made
+    of ~`chunks_per_segment` splitter chunks.
+
+    Args:
+        transcript_len (int): Length of the youtube transcript in characters.
+        budget (ModelBudget): Limits of the extraction model.
+        chunks_per_segment (int): Target number of chunks per segment.
+
+    Returns:
+        dict: {'chunk_size': int, 'segment_size': int}
+    """
+    n_segments = plan_segment_count(transcript_len, budget)
+    segment_chars = math.ceil(transcript_len / n_segments) if transcript_len else 1
+    chunk_size = segment_chars / chunks_per_segment
+    # Round to the nearest 100 and keep the splitter in a sane range.
+    chunk_size = int(min(4000, max(500, round(chunk_size / 100) * 100)))
+    segment_size = max(1, math.ceil(segment_chars / chunk_size))
+    return {"chunk_size": chunk_size, "segment_size": segment_size}
+
+
+def group_by_budget(texts: list, budget_tokens: int) -> list:
+    """
+    Group consecutive texts so each group's estimated size stays within a budget.
+
+    Every group except possibly the last holds at least two texts, so a
+    reduce level always shrinks, even when single texts exceed the budget.
+
+    Args:
+        texts (list[str]): Items to group, in order.
+        budget_tokens (int): Target upper bound of tokens per group.
+
+    Returns:
+        list[list[str]]: The groups, in order.
+    """
+    groups, current, size = [], [], 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and len(current) >= 2 and size + tokens > budget_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += tokens
+    if current:
+        groups.append(current)
+    return groups
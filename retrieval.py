@@ -0,0 +1,214 @@
+"""
+Local BM25 retrieval over processed transcripts for follow-up questions.
+
+When a video is processed, its transcript is cut into short passages (a few
+caption chunks each, with the second they start at) and indexed with BM25.
+The inverted index is persisted per video ID, so a later question about the
+video ("what did they say about X at minute 40?") only sends the top-k
+passages to the model: prompt size and latency stay flat however long the
+video is.
+"""
+from dedup import terms
+from planner import estimate_tokens
+from segmenter import segment_offsets
+from store import BlobStore, TTLCache, default_path
+import math, os, re
+
+INDEX_VERSION = 1
+TIME_REFERENCES = (
+    re.compile(r"\b(?:(\d{1,2}):)?(\d{1,2}):(\d{2})\b"),                                  # 1:02:03 / 40:00
+    re.compile(r"\b(?:minute|min)\s*(\d{1,3})\b", re.IGNORECASE),                        # minute 40
+    re.compile(r"\b(\d{1,3})\s*(?:minutes?|mins?)\s*(?:in|into|mark)\b", re.IGNORECASE),  # 40 minutes in
+)
+
+
+def format_timestamp(seconds) -> str:
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def parse_time_reference(text: str):
+    """Second of the video a question points at ("at 40:00", "minute 40"), or None."""
+    match = TIME_REFERENCES[0].search(text)
+    if match:
+        hours, minutes, seconds = match.groups()
+        return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+    for pattern in TIME_REFERENCES[1:]:
+        match = pattern.search(text)
+        if match:
+            return int(match.group(1)) * 60
+    return None
+
+
+def passages_from_chunks(text: str, chunks: list, max_tokens: int = 250) -> list:
+    """
+    Group the caption chunks of a transcript into passages of about `max_tokens` tokens.
+
+    Consecutive chunks are merged until the budget is reached; chunks longer
+    than the budget are split on sentence/word boundaries.
+
+    Args:
+        text (str): The (already cleaned) transcript.
+        chunks (list): [start, end, start_seconds] of each caption chunk in
+            `text`; start_seconds (if any) becomes the passage start.
+        max_tokens (int): Approximate size of one passage.
+
+    Returns:
+        list[dict]: [{'text', 'start'}], start in seconds or None.
+    """
+    return _passages(((text[start:end], seconds) for start, end, seconds in chunks), max_tokens)
+
+
+def _passages(pieces, max_tokens: int) -> list:
+    passages = []
+    parts, start = [], None
+
+    def flush():
+        text = " ".join(parts).strip()
+        if text:
+            passages.append({"text": text, "start": start})
+
+    for text, doc_start in pieces:
+        text = text.strip()
+        if not text:
+            continue
+        if estimate_tokens(text) > max_tokens:
+            if parts:
+                flush()
+                parts = []
+            for begin, end in segment_offsets(text, max_tokens):
+                parts, start = [text[begin:end]], doc_start
+                flush()
+            parts = []
+            continue
+        if parts and estimate_tokens(" ".join(parts)) + estimate_tokens(text) > max_tokens:
+            flush()
+            parts = []
+        if not parts:
+            start = doc_start
+        parts.append(text)
+    if parts:
+        flush()
+    return passages
+
+
+class BM25Index:
+    """
+    Okapi BM25 over transcript passages.
+
+    Args:
+        passages (list[dict]): [{'text', 'start'}] in transcript order.
+        k1 (float): Term frequency saturation.
+        b (float): Length normalization.
+    """
+
+    def __init__(self, passages: list, k1: float = 1.5, b: float = 0.75, postings: dict = None,
+                 lengths: list = None):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        if postings is None:
+            postings, lengths = {}, []
+            for i, passage in enumerate(passages):
+                counts = {}
+                words = terms(passage["text"])
+                for word in words:
+                    counts[word] = counts.get(word, 0) + 1
+                for word, count in counts.items():
+                    postings.setdefault(word, []).append([i, count])
+                lengths.append(len(words))
+        self.postings = postings
+        self.lengths = lengths
+        self.average_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    def _idf(self, word: str) -> float:
+        n = len(self.postings.get(word, ()))
+        return math.log(1 + (len(self.passages) - n + 0.5) / (n + 0.5))
+
+    def search(self, query: str, k: int = 5, at_seconds: float = None) -> list:
+        """
+        Top-k passages for `query`, returned in transcript order.
+
+        When `at_seconds` is given, the passage covering that moment is
+        always included, and its neighbours are boosted.
+
+        Returns:
+            list[dict]: Passages with an added 'score'.
+        """
+        scores = {}
+        for word in set(terms(query)):
+            idf = self._idf(word)
+            for i, count in self.postings.get(word, ()):
+                norm = 1 - self.b + self.b * self.lengths[i] / (self.average_length or 1)
+                scores[i] = scores.get(i, 0.0) + idf * count * (self.k1 + 1) / (count + self.k1 * norm)
+        pinned = None
+        if at_seconds is not None:
+            pinned = self.locate(at_seconds)
+            if pinned is not None:
+                top = max(scores.values(), default=1.0)
+                for i in (pinned - 1, pinned + 1):
+                    if 0 <= i < len(self.passages):
+                        scores[i] = scores.get(i, 0.0) + top / 2
+        ranked = sorted(scores, key=lambda i: -scores[i])[:k]
+        if pinned is not None and pinned not in ranked:
+            ranked = ranked[: max(0, k - 1)] + [pinned]
+        return [{**self.passages[i], "score": round(scores.get(i, 0.0), 3)} for i in sorted(ranked)]
+
+    def locate(self, seconds: float):
+        """Index of the passage playing at `seconds`, or None without timestamps."""
+        found = None
+        for i, passage in enumerate(self.passages):
+            if passage.get("start") is None:
+                return None
+            if passage["start"] > seconds:
+                break
+            found = i
+        return found
+
+    def to_dict(self) -> dict:
+        return {"version": INDEX_VERSION, "k1": self.k1, "b": self.b, "passages": self.passages,
+                "postings": self.postings, "lengths": self.lengths}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return cls(data["passages"], data["k1"], data["b"], data["postings"], data["lengths"])
+
+
+class IndexStore:
+    """BM25 indexes per video ID in SQLite, with the recently used ones kept in memory."""
+
+    def __init__(self, path: str = None, max_bytes: int = 128 * 1024 * 1024, ttl: float = None,
+                 memory_entries: int = 16):
+        self.store = BlobStore(path or default_path("indexes.sqlite"), "indexes", max_bytes=max_bytes, ttl=ttl)
+        self.memory = TTLCache(ttl=3600, max_entries=memory_entries)
+
+    def get(self, video_id: str):
+        if not video_id:
+            return None
+        index = self.memory.get(video_id)
+        if index is None:
+            data = self.store.get(video_id)
+            index = BM25Index.from_dict(data) if data else None
+            if index is not None:
+                self.memory.set(video_id, index)
+        return index
+
+    def put(self, video_id: str, index: BM25Index):
+        if video_id and index.passages:
+            self.store.put(video_id, index.to_dict())
+            self.memory.set(video_id, index)
+
+
+def index_store_from_env():
+    """Build the store configured by TRANSCRIPT_INDEX* variables, or None if disabled."""
+    if os.getenv("TRANSCRIPT_INDEX", "1") == "0":
+        return None
+    ttl = os.getenv("TRANSCRIPT_INDEX_TTL")
+    return IndexStore(os.getenv("TRANSCRIPT_INDEX_PATH"),
+                      int(os.getenv("TRANSCRIPT_INDEX_MAX_MB", "128")) * 1024 * 1024,
+                      float(ttl) if ttl else None)
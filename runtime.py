@@ -0,0 +1,71 @@
+"""
+Process-wide background event loop for running graphs from sync code.
+
+Streamlit executes every session's script in its own thread. Instead of
+creating and closing an event loop per request (which throws away the
+pooled gRPC/HTTP connections of the model clients), all sessions submit
+their graph runs to one long-lived loop running in a daemon thread, with a
+global cap on the number of runs executing at the same time.
+"""
+from concurrent.futures import Future
+import asyncio, os, threading
+
+
+class BackgroundRunner:
+    """
+    A single asyncio loop in a daemon thread that runs submitted coroutines.
+
+    Args:
+        max_concurrent_runs (int): Runs allowed to execute at once; further
+            submissions wait in FIFO order.
+    """
+
+    def __init__(self, max_concurrent_runs: int = 4):
+        self.max_concurrent_runs = max_concurrent_runs
+        self.loop = asyncio.new_event_loop()
+        self._slots = asyncio.Semaphore(max_concurrent_runs)
+        self.active = 0
+        self.queued = 0
+        self._thread = threading.Thread(target=self._run, name="graph-runner", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _guarded(self, coro):
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            coro.close()
+            raise
+        finally:
+            self.queued -= 1
+        self.active += 1
+        try:
+            return await coro
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    def submit(self, coro) -> Future:
+        """Schedule a coroutine on the background loop and return its future."""
+        return asyncio.run_coroutine_threadsafe(self._guarded(coro), self.loop)
+
+    def run(self, coro, timeout: float = None):
+        """Submit a coroutine and block the calling thread until it finishes."""
+        return self.submit(coro).result(timeout)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner() -> BackgroundRunner:
+    """Return the process-wide runner, starting it on first use."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = BackgroundRunner(int(os.getenv("MAX_CONCURRENT_RUNS", "4")))
+        return _runner
@@ -0,0 +1,213 @@
+"""
+Rate-limit aware scheduler for concurrent LLM calls.
+
+Paces requests against a requests/minute and tokens/minute budget, caps the
+number of in-flight calls and retries transient failures (429, 5xx, timeouts)
+with jittered exponential backoff, so one throttled segment does not fail the
+whole batch. Each call records a "scheduler" span with the time spent
+waiting for budget/slots versus inside the call (see telemetry.py).
+"""
+from planner import ModelBudget
+from telemetry import record
+import asyncio, random, time
+
+RETRYABLE_ERRORS = (
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "DeadlineExceeded", "InternalServerError", "RateLimitError",
+)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether an exception looks like a transient quota/server error."""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if type(exc).__name__ in RETRYABLE_ERRORS:
+        return True
+    message = str(exc)
+    return "429" in message or "503" in message or "quota" in message.lower()
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """Whether an exception is a quota error (429), i.e. a call that should be paced and retried."""
+    if type(exc).__name__ in ("ResourceExhausted", "TooManyRequests", "RateLimitError"):
+        return True
+    message = str(exc)
+    return "429" in message or "quota" in message.lower()
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate_per_minute`.
+
+    The bucket starts full so a fresh run may burst up to one minute of budget.
+    """
+
+    def __init__(self, rate_per_minute: float, clock=time.monotonic):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds to wait before `amount` tokens are available (0 if now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimitedScheduler:
+    """
+    Run coroutine factories under an RPM/TPM budget with bounded concurrency.
+
+    Args:
+        budget (ModelBudget): Limits of the model being called.
+        max_retries (int): Retries per call for transient errors.
+        base_delay (float): First backoff delay in seconds.
+        max_delay (float): Upper bound of a single backoff delay.
+        name (str): Label of the scheduler in traces and metrics.
+    """
+
+    def __init__(self, budget: ModelBudget, max_retries: int = 4,
+                 base_delay: float = 2.0, max_delay: float = 60.0, name: str = "llm"):
+        self.budget = budget
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.requests = TokenBucket(budget.rpm)
+        self.tokens = TokenBucket(budget.tpm)
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "tokens": 0}
+        self._loop = None
+
+    def _primitives(self):
+        # asyncio primitives are bound to one event loop; rebuild them when a
+        # new loop (e.g. a new Streamlit run) starts using the scheduler.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(max(1, self.budget.target_concurrency))
+        return self._lock, self._slots
+
+    async def _acquire(self, tokens: int):
+        lock, _ = self._primitives()
+        async with lock:
+            while True:
+                delay = max(self.requests.delay_for(1), self.tokens.delay_for(tokens))
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+
+    def try_acquire(self, tokens: int) -> bool:
+        """Take budget for one extra call only if it is available right now."""
+        self._primitives()
+        if self._lock.locked() or self.requests.delay_for(1) > 0 or self.tokens.delay_for(tokens) > 0:
+            return False
+        self.requests.consume(1)
+        self.tokens.consume(tokens)
+        self.stats["calls"] += 1
+        self.stats["tokens"] += tokens
+        return True
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def run(self, factory, tokens: int = 1):
+        """
+        Await `factory()` once the budget allows it, retrying transient errors.
+
+        Args:
+            factory: Zero-argument callable returning a fresh awaitable.
+            tokens (int): Estimated prompt + output tokens of the call. A
+                call estimated at 0 tokens (e.g. a cache hit) is not paced.
+        """
+        if tokens == 0:
+            return await factory()
+        _, slots = self._primitives()
+        attempt = 0
+        started = time.perf_counter()
+        wait = service = 0.0
+        status = "error"
+        try:
+            while True:
+                queued = time.perf_counter()
+                await self._acquire(tokens)
+                async with slots:
+                    called = time.perf_counter()
+                    wait += called - queued
+                    try:
+                        self.stats["calls"] += 1
+                        self.stats["tokens"] += tokens
+                        result = await factory()
+                        status = "ok"
+                        return result
+                    except Exception as e:
+                        if attempt >= self.max_retries or not is_retryable(e):
+                            self.stats["failures"] += 1
+                            raise
+                        error = e
+                    finally:
+                        service += time.perf_counter() - called
+                attempt += 1
+                self.stats["retries"] += 1
+                delay = self.backoff(attempt)
+                print(f"Retrying call in {delay:.1f}s after error: {error}")
+                await asyncio.sleep(delay)
+        finally:
+            record("scheduler", self.name, time.perf_counter() - started, started,
+                   wait=round(wait, 4), service=round(service, 4), retries=attempt,
+                   tokens=tokens, status=status)
+
+    async def map(self, factories, tokens=None, on_done=None):
+        """
+        Run many calls and keep partial results.
+
+        Args:
+            factories (list): Zero-argument callables returning awaitables.
+            tokens (list[int] | None): Token estimate per call.
+            on_done (callable | None): Called with (finished, total) each
+                time a call succeeds or gives up.
+
+        Returns:
+            tuple[list, list]: Results (None for failed calls) and the
+            (index, exception) pairs of the failures.
+        """
+        tokens = tokens or [1] * len(factories)
+        finished = 0
+
+        async def tracked(factory, amount):
+            nonlocal finished
+            try:
+                return await self.run(factory, amount)
+            finally:
+                finished += 1
+                if on_done:
+                    on_done(finished, len(factories))
+
+        outcomes = await asyncio.gather(
+            *(tracked(f, t) for f, t in zip(factories, tokens)),
+            return_exceptions=True,
+        )
+        results, errors = [], []
+        for i, outcome in enumerate(outcomes):
+            if isinstance(outcome, BaseException):
+                errors.append((i, outcome))
+                results.append(None)
+            else:
+                results.append(outcome)
+        return results, errors
@@ -0,0 +1,170 @@
+"""
+Concurrent, cached web lookups for the summary2 branch.
+
+Topics are searched in parallel on a bounded thread pool through a single
+pooled HTTP session, results are cached per query with a TTL, and snippets
+that show up under several topics are kept only once. A failed lookup only
+drops its own topic, but a missing or rejected API key, or every topic
+failing, raises so the run fails instead of writing a summary without sources.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from store import TTLCache
+from telemetry import record
+import asyncio, contextvars, json, os, threading, time
+
+TAVILY_API_URL = "https://api.tavily.com/search"
+
+
+class SearchConfigurationError(RuntimeError):
+    """The search backend cannot work as configured (no or rejected API key)."""
+
+
+class SearchError(RuntimeError):
+    """Every topic lookup of a request failed."""
+
+
+def normalize_results(response) -> list:
+    """Turn the different Tavily response shapes into a list of result dicts."""
+    if isinstance(response, dict) and "results" in response:
+        return response["results"]
+    if response and hasattr(response, "results"):
+        return response.results
+    if isinstance(response, list):
+        return response
+    if hasattr(response, "content"):
+        try:
+            return json.loads(response.content)
+        except Exception:
+            return []
+    return []
+
+
+class TavilyBackend:
+    """Minimal Tavily client that keeps one pooled `requests.Session`."""
+
+    def __init__(self, api_key: str = None, max_results: int = 3, timeout: float = 20):
+        import requests
+        self.api_key = api_key or os.getenv("TAVILY_API_KEY")
+        self.max_results = max_results
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=16)
+        self.session.mount("https://", adapter)
+
+    def __call__(self, query: str) -> list:
+        if not self.api_key:
+            raise SearchConfigurationError("TAVILY_API_KEY is not set.")
+        response = self.session.post(
+            TAVILY_API_URL,
+            json={"query": query, "max_results": self.max_results},
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=self.timeout,
+        )
+        if response.status_code in (401, 403):
+            raise SearchConfigurationError(f"Tavily rejected TAVILY_API_KEY ({response.status_code}).")
+        response.raise_for_status()
+        return normalize_results(response.json())
+
+
+class TopicSearcher:
+    """
+    Search many topics concurrently with a shared backend and result cache.
+
+    Args:
+        backend: Callable `query -> list[dict]`; defaults to a lazily built
+            `TavilyBackend`. Pass a fake here to test without the network.
+        max_workers (int): Size of the search thread pool.
+        ttl (float): Seconds a cached query result stays valid.
+    """
+
+    def __init__(self, backend=None, max_workers: int = 4, ttl: float = 6 * 3600,
+                 max_entries: int = 2048):
+        self._backend = backend
+        self.max_workers = max_workers
+        self.cache = TTLCache(ttl=ttl, max_entries=max_entries)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = TavilyBackend()
+            return self._backend
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="search")
+            return self._pool
+
+    def search(self, query: str) -> list:
+        """Search one query, serving repeats from the cache; backend errors are raised."""
+        started = time.perf_counter()
+        key = " ".join(query.lower().split())
+        cached = self.cache.get(key)
+        if cached is not None:
+            record("search", "tavily", time.perf_counter() - started, started, cache="hit", status="ok")
+            return cached
+        try:
+            results = self.backend(query)
+        except Exception:
+            record("search", "tavily", time.perf_counter() - started, started, cache="miss", status="error")
+            raise
+        record("search", "tavily", time.perf_counter() - started, started, cache="miss", status="ok")
+        self.cache.set(key, results)
+        return results
+
+    async def asearch_many(self, topics: list) -> list:
+        """
+        Search all topics concurrently on the search pool, off the event loop.
+
+        Returns:
+            list: [{'keypoint', 'information', 'url'}] with duplicate
+            snippets across topics removed.
+
+        Raises:
+            SearchConfigurationError: The backend is not usable as configured.
+            SearchError: Every topic failed; single failures only drop their topic.
+        """
+        # Pool threads do not inherit context variables; each search runs in a
+        # copy of the caller's context so its span lands on the caller's trace.
+        loop = asyncio.get_running_loop()
+        outcomes = await asyncio.gather(
+            *(loop.run_in_executor(self.pool, contextvars.copy_context().run, self.search, topic)
+              for topic in topics),
+            return_exceptions=True,
+        )
+        responses = []
+        for topic, outcome in zip(topics, outcomes):
+            if isinstance(outcome, SearchConfigurationError):
+                raise outcome
+            if isinstance(outcome, BaseException):
+                print(f"Search failed for '{topic}': {outcome}")
+                outcome = []
+            responses.append(outcome)
+        failed = [o for o in outcomes if isinstance(o, BaseException)]
+        if topics and len(failed) == len(topics):
+            raise SearchError(f"All {len(topics)} topic searches failed; last error: {failed[-1]}") from failed[-1]
+        return dedupe_snippets(zip(topics, responses))
+
+
+def dedupe_snippets(topic_results) -> list:
+    """Flatten (topic, results) pairs, keeping each url/snippet only once."""
+    seen = set()
+    results = []
+    for topic, raw_results in topic_results:
+        for item in raw_results:
+            info = item.get("snippet") or item.get("content") or ""
+            url = item.get("url") or ""
+            key = (url, " ".join(info.split()))
+            if not (info and url) or key in seen:
+                continue
+            seen.add(key)
+            results.append({
+                "keypoint": topic,
+                "information": info,
+                "url": url
+            })
+    return results
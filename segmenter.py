@@ -0,0 +1,167 @@
+"""
+Single-pass, token-budget transcript segmenter.
+
+Produces (start, end) offsets into the transcript string instead of
+splitting it into chunks and re-joining them: segments are sized by an
+estimated token budget, end on a sentence or word boundary where possible,
+and may overlap their predecessor by a few tokens. `StreamingSegmenter` cuts
+the same segments from a transcript that arrives piece by piece.
+"""
+from planner import CHARS_PER_TOKEN
+import re
+
+SENTENCE_END = re.compile(r"[.!?\n]\s")
+NON_SPACE = re.compile(r"\S")
+
+
+def _boundary(text: str, start: int, end: int) -> int:
+    """Best cut position in text[start:end]: sentence end, then whitespace."""
+    window = max(start + 1, end - (end - start) // 5)
+    last = None
+    for match in SENTENCE_END.finditer(text, window, end):
+        last = match.end()
+    if last is not None:
+        return last
+    space = text.rfind(" ", window, end)
+    if space > start:
+        return space + 1
+    return end
+
+
+def segment_offsets(text: str, max_tokens: int, overlap_tokens: int = 0,
+                    chars_per_token: int = CHARS_PER_TOKEN) -> list:
+    """
+    Split a transcript into segments of at most ~`max_tokens` tokens.
+
+    Args:
+        text (str): The whole transcript.
+        max_tokens (int): Estimated token budget of one segment.
+        overlap_tokens (int): Tokens each segment repeats from the previous one.
+        chars_per_token (int): Characters per token used for the estimate.
+
+    Returns:
+        list[tuple[int, int]]: (start, end) offsets into `text`, in order.
+    """
+    length = len(text)
+    size = max(1, max_tokens * chars_per_token)
+    overlap = min(max(0, overlap_tokens * chars_per_token), size // 2)
+    offsets = []
+    start = 0
+    while start < length:
+        end = min(length, start + size)
+        if length - end < size // 10:
+            # Fold a tiny tail into this segment rather than sending it alone.
+            end = length
+        else:
+            end = _boundary(text, start, end)
+        if NON_SPACE.search(text, start, end):
+            offsets.append((start, end))
+        if end >= length:
+            break
+        next_start = end
+        if overlap:
+            next_start = text.find(" ", end - overlap, end)
+            next_start = end if next_start == -1 else next_start + 1
+        start = max(next_start, start + 1)
+    return offsets
+
+
+class StreamingSegmenter:
+    """
+    Incremental `segment_offsets` for a transcript that arrives in pieces.
+
+    A segment is released as soon as enough text follows it to be sure the
+    one-shot segmenter would cut it the same way, so for the same budget the
+    offsets match `segment_offsets` over the joined transcript.
+
+    Args:
+        max_tokens (int): Estimated token budget of one segment.
+        overlap_tokens (int): Tokens each segment repeats from the previous one.
+        separator (str): Inserted between consecutive pieces.
+    """
+
+    def __init__(self, max_tokens: int, overlap_tokens: int = 0, separator: str = " ",
+                 chars_per_token: int = CHARS_PER_TOKEN):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.separator = separator
+        self.chars_per_token = chars_per_token
+        self.size = max(1, max_tokens * chars_per_token)
+        self.overlap = min(max(0, overlap_tokens * chars_per_token), self.size // 2)
+        self.offsets = []
+        self.length = 0
+        self._parts = []
+        self._pending = ""   # text from `_base` on; everything before it is segmented
+        self._base = 0
+
+    @property
+    def pending_length(self) -> int:
+        """Characters fed but not segmented yet."""
+        return len(self._pending)
+
+    def resize(self, max_tokens: int):
+        """
+        Change the budget of the segments still to come.
+
+        The offsets then no longer match a single `segment_offsets` call.
+        """
+        self.max_tokens = max_tokens
+        self.size = max(1, max_tokens * self.chars_per_token)
+        self.overlap = min(max(0, self.overlap_tokens * self.chars_per_token), self.size // 2)
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far, joined with the separator."""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def feed(self, piece: str) -> list:
+        """
+        Add the next piece of the transcript.
+
+        Returns:
+            list[str]: The segments completed by this piece, in order.
+        """
+        if not piece:
+            return []
+        if self._parts:
+            piece = self.separator + piece
+        self._parts.append(piece)
+        self.length += len(piece)
+        self._pending += piece
+        segments = []
+        # Keep a tenth of a segment in hand: a smaller tail would be folded
+        # into the segment before it.
+        while len(self._pending) >= self.size + self.size // 10:
+            end = _boundary(self._pending, 0, self.size)
+            segments.extend(self._emit(0, end))
+            next_start = end
+            if self.overlap:
+                next_start = self._pending.find(" ", end - self.overlap, end)
+                next_start = end if next_start == -1 else next_start + 1
+            next_start = max(next_start, 1)
+            self._base += next_start
+            self._pending = self._pending[next_start:]
+        return segments
+
+    def finish(self) -> list:
+        """
+        Segment whatever is left once the transcript is complete.
+
+        Returns:
+            list[str]: The last segments, in order.
+        """
+        segments = []
+        for start, end in segment_offsets(self._pending, self.max_tokens, self.overlap_tokens,
+                                          self.chars_per_token):
+            segments.extend(self._emit(start, end))
+        self._base += len(self._pending)
+        self._pending = ""
+        return segments
+
+    def _emit(self, start: int, end: int) -> list:
+        if not NON_SPACE.search(self._pending, start, end):
+            return []
+        self.offsets.append((self._base + start, self._base + end))
+        return [self._pending[start:end]]
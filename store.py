@@ -0,0 +1,151 @@
+"""
+Cache primitives: an in-memory TTL/LRU cache and a small SQLite-backed
+key/value store shared by the on-disk caches.
+
+BlobStore values are zlib-compressed JSON. Entries are evicted
+least-recently-used once the table grows past `max_bytes`, and optionally
+expire after `ttl` seconds. SQLite's file locking makes a store safe to
+share between threads and between processes (Streamlit workers, batch
+jobs, the CLI).
+"""
+from collections import OrderedDict
+from contextlib import closing
+import json, os, sqlite3, threading, time, zlib
+
+CACHE_DIR = os.getenv("YT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "yt-notes"))
+
+
+def default_path(name: str) -> str:
+    return os.path.join(CACHE_DIR, name)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 1024, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or self.clock() - entry[0] > self.ttl:
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class BlobStore:
+    """
+    Compressed JSON values in one SQLite table with LRU/size and TTL eviction.
+
+    Args:
+        path (str): SQLite file, created on first use.
+        table (str): Table name; several stores may share one file.
+        max_bytes (int | None): Total compressed size before LRU eviction.
+        ttl (float | None): Seconds after which an entry is treated as missing.
+    """
+
+    def __init__(self, path: str, table: str = "entries", max_bytes: int = None,
+                 ttl: float = None, clock=time.time):
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table}(accessed)")
+            self._ready = True
+        return conn
+
+    def get(self, key: str):
+        """Return the stored value or None if missing or expired."""
+        now = self.clock()
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, value):
+        """Store a JSON-serializable value and evict old entries if needed."""
+        blob = zlib.compress(json.dumps(value).encode("utf-8"), 6)
+        now = self.clock()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, size, created, accessed) "
+                    "VALUES (?, ?, ?, ?, ?)", (key, blob, len(blob), now, now)
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, key: str):
+        with closing(self._connect()) as conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def _evict(self, conn: sqlite3.Connection):
+        if self.ttl is not None:
+            conn.execute(f"DELETE FROM {self.table} WHERE created < ?", (self.clock() - self.ttl,))
+        if self.max_bytes is None:
+            return
+        total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute(
+            f"SELECT key, size FROM {self.table} ORDER BY accessed ASC"
+        ).fetchall():
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        with closing(self._connect()) as conn:
+            count, size = conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        return {"entries": count, "bytes": size}
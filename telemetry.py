@@ -0,0 +1,319 @@
+"""
+Per-run traces and process-wide metrics.
+
+Every graph node, model call, scheduled call and web search records a span
+on the trace of the run it belongs to (carried in a context variable, so
+nodes and wrappers do not have to pass it around) and updates the
+process-wide Prometheus-style metrics:
+
+- yt_runs_total / yt_run_seconds                   graph runs by status
+- yt_runs_coalesced_total                          runs attached to an identical in-flight run
+- yt_node_seconds                                  node wall time
+- yt_llm_call_seconds, yt_llm_*_tokens_total       model calls by model, node and cache tier
+- yt_scheduler_wait_seconds / _service_seconds     queue wait vs. time in the call
+- yt_scheduler_retries_total / _failures_total
+- yt_search_seconds                                web searches by cache hit/miss
+- yt_hedged_calls_total                            hedged model calls by outcome (see hedging.py)
+
+Metrics are written to METRICS_PATH after every run and/or served on
+http://localhost:METRICS_PORT/metrics. LOG_LEVEL=DEBUG turns on the
+verbose state dumps and per-run trace summaries.
+"""
+from contextvars import ContextVar
+import functools, inspect, os, threading, time, uuid
+
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+LOG_LEVEL = LOG_LEVELS.get(os.getenv("LOG_LEVEL", "INFO").upper(), 20)
+METRICS_PATH = os.getenv("METRICS_PATH")
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def debug(*args):
+    """`print` that is only shown with LOG_LEVEL=DEBUG."""
+    if LOG_LEVEL <= LOG_LEVELS["DEBUG"]:
+        print(*args)
+
+
+class Metrics:
+    """Thread-safe counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        def labels(pairs, extra=()):
+            pairs = list(pairs) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self.histograms.items())
+        declared = set()
+        for (name, pairs), value in counters:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{labels(pairs)} {value:g}")
+        for (name, pairs), (counts, total, count) in histograms:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{name}_bucket{labels(pairs, [('le', f'{bound:g}')])} {bucket_count}")
+            lines.append(f"{name}_bucket{labels(pairs, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{labels(pairs)} {total:.6f}")
+            lines.append(f"{name}_count{labels(pairs)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Atomically replace `path` with the current metrics (node_exporter textfile style)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+METRICS = Metrics()
+
+
+class Trace:
+    """
+    Spans recorded during one graph run.
+
+    Each span is a dict with 'kind' (node, llm, scheduler, search), 'name',
+    'start' (seconds since the run started), 'seconds' and kind specific
+    fields such as tokens, cache tier, queue wait or retries.
+    """
+
+    def __init__(self, run_id: str = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.status = None
+        self.coalesced_with = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, name: str, seconds: float, started: float = None, **fields):
+        start = (started if started is not None else time.perf_counter() - seconds) - self.started
+        span = {"kind": kind, "name": name, "start": round(start, 4), "seconds": round(seconds, 4), **fields}
+        with self._lock:
+            self.spans.append(span)
+
+    def attach(self, other: "Trace"):
+        """Adopt the spans of the run this one was coalesced into (see coalesce.py)."""
+        with other._lock:
+            spans = list(other.spans)
+        with self._lock:
+            self.spans.extend(spans)
+        self.coalesced_with = other.run_id
+
+    def finish(self, status: str = "ok"):
+        self.seconds = time.perf_counter() - self.started
+        self.status = status
+
+    def summary(self) -> dict:
+        """Totals per node and per call kind, e.g. to find the dominant stage."""
+        with self._lock:
+            spans = list(self.spans)
+        nodes = {}
+        for span in spans:
+            if span["kind"] == "node":
+                nodes[span["name"]] = round(nodes.get(span["name"], 0.0) + span["seconds"], 4)
+        llm = [s for s in spans if s["kind"] == "llm"]
+        scheduled = [s for s in spans if s["kind"] == "scheduler"]
+        searches = [s for s in spans if s["kind"] == "search"]
+        return {
+            "run_id": self.run_id,
+            "status": self.status,
+            "coalesced_with": self.coalesced_with,
+            "seconds": round(self.seconds, 4) if self.seconds is not None else None,
+            "nodes": nodes,
+            "slowest_node": max(nodes, key=nodes.get) if nodes else None,
+            "llm": {
+                "calls": len(llm),
+                "cache_hits": sum(1 for s in llm if s.get("cache") in ("memory", "disk")),
+                "seconds": round(sum(s["seconds"] for s in llm), 4),
+                "prompt_tokens": sum(s.get("prompt_tokens", 0) for s in llm),
+                "response_tokens": sum(s.get("response_tokens", 0) for s in llm),
+            },
+            "scheduler": {
+                "calls": len(scheduled),
+                "wait_seconds": round(sum(s.get("wait", 0.0) for s in scheduled), 4),
+                "service_seconds": round(sum(s.get("service", 0.0) for s in scheduled), 4),
+                "retries": sum(s.get("retries", 0) for s in scheduled),
+            },
+            "search": {
+                "calls": len(searches),
+                "cache_hits": sum(1 for s in searches if s.get("cache") == "hit"),
+                "seconds": round(sum(s["seconds"] for s in searches), 4),
+            },
+        }
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+        return {**self.summary(), "spans": spans}
+
+
+_current_trace = ContextVar("trace", default=None)
+
+
+def current_trace():
+    """Trace of the run being executed, or None outside `traced_run`."""
+    return _current_trace.get()
+
+
+def record(kind: str, name: str, seconds: float, started: float = None, **fields):
+    """Add a span to the current trace (if any) and update the metrics."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(kind, name, seconds, started, **fields)
+    if kind == "node":
+        METRICS.observe("yt_node_seconds", seconds, node=name, status=fields.get("status"))
+    elif kind == "llm":
+        labels = {"model": name, "node": fields.get("node"), "cache": fields.get("cache")}
+        METRICS.observe("yt_llm_call_seconds", seconds, **labels)
+        METRICS.inc("yt_llm_prompt_tokens_total", fields.get("prompt_tokens", 0), **labels)
+        METRICS.inc("yt_llm_response_tokens_total", fields.get("response_tokens", 0), **labels)
+    elif kind == "scheduler":
+        METRICS.observe("yt_scheduler_wait_seconds", fields.get("wait", 0.0), scheduler=name)
+        METRICS.observe("yt_scheduler_service_seconds", fields.get("service", 0.0), scheduler=name)
+        METRICS.inc("yt_scheduler_retries_total", fields.get("retries", 0), scheduler=name)
+        if fields.get("status") == "error":
+            METRICS.inc("yt_scheduler_failures_total", scheduler=name)
+    elif kind == "search":
+        METRICS.observe("yt_search_seconds", seconds, cache=fields.get("cache"))
+
+
+class traced_run:
+    """
+    Context manager making `trace` the current trace for the block.
+
+    On exit the run is finished, counted in the metrics, written to
+    METRICS_PATH and summarized at debug level.
+    """
+
+    def __init__(self, trace: Trace = None):
+        self.trace = trace or Trace()
+
+    def __enter__(self) -> Trace:
+        self._token = _current_trace.set(self.trace)
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_trace.reset(self._token)
+        status = "ok" if exc_type is None else "error"
+        self.trace.finish(status)
+        METRICS.inc("yt_runs_total", status=status)
+        METRICS.observe("yt_run_seconds", self.trace.seconds, status=status)
+        if METRICS_PATH:
+            try:
+                METRICS.write(METRICS_PATH)
+            except OSError as e:
+                print(f"Could not write metrics to {METRICS_PATH}: {e}")
+        debug("🔎 trace:", self.trace.summary())
+        return False
+
+
+def instrument_node(name: str, fn):
+    """Wrap a graph node (sync or async) so each execution records a node span."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def node(state):
+            started, status = time.perf_counter(), "ok"
+            try:
+                return await fn(state)
+            except BaseException:
+                status = "error"
+                raise
+            finally:
+                record("node", name, time.perf_counter() - started, started, status=status)
+    else:
+        @functools.wraps(fn)
+        def node(state):
+            started, status = time.perf_counter(), "ok"
+            try:
+                return fn(state)
+            except BaseException:
+                status = "error"
+                raise
+            finally:
+                record("node", name, time.perf_counter() - started, started, status=status)
+    return node
+
+
+_server = None
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0"):
+    """Serve METRICS on http://host:port/metrics from a daemon thread (once per process)."""
+    global _server
+    if _server is not None:
+        return _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = METRICS.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return _server
+
+
+def metrics_from_env():
+    """Start the metrics endpoint when METRICS_PORT is set."""
+    port = os.getenv("METRICS_PORT")
+    if port:
+        try:
+            serve_metrics(int(port))
+        except OSError as e:
+            print(f"Could not serve metrics on port {port}: {e}")
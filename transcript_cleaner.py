@@ -0,0 +1,98 @@
+"""
+Noise reduction for auto-generated YouTube captions.
+
+All enabled rules are compiled into one alternation and applied in a
+single `re.sub` pass over the transcript:
+
+- tags:       [Music], [Applause], (laughter), ♪ ... caption annotations
+- fillers:    um, uh, erm, hmm, mhm ... filler words
+- repeats:    phrases of up to six words repeated back to back, as produced
+              by rolling captions ("so the model so the model learns")
+- whitespace: runs of spaces, tabs and newlines
+"""
+from planner import estimate_tokens
+import re
+
+RULES = {
+    "tags": r"(?:\[[^\]\n]{1,40}\]|\((?:music|applause|laughter|laughs|inaudible|silence|cheering)\)|[♪♫]+)\s*",
+    # Longest alternatives first: "uh+" would otherwise eat the "uh" of "uh-huh".
+    "fillers": r"\b(?:uh-huh|um+|uh+|erm+|er|ah+|hmm+|mhm)\b[,.]?\s*",
+    "repeats": r"\b(?P<phrase>\w+(?:\s+\w+){0,5})(?:\s+(?P=phrase)\b)+",
+    "whitespace": r"\s{2,}|[\t\n\r]",
+}
+DEFAULT_RULES = tuple(RULES)
+
+
+class TranscriptCleaner:
+    """
+    Single-pass transcript normalizer with toggleable rules.
+
+    Args:
+        rules (tuple[str]): Names of the RULES to apply.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES):
+        unknown = set(rules) - set(RULES)
+        if unknown:
+            raise ValueError(f"Unknown transcript cleaning rules: {', '.join(sorted(unknown))}")
+        self.rules = tuple(rule for rule in RULES if rule in rules)
+        self.pattern = None
+        if self.rules:
+            self.pattern = re.compile(
+                "|".join(f"(?P<{rule}>{RULES[rule]})" for rule in self.rules),
+                re.IGNORECASE,
+            )
+
+    def clean(self, text: str):
+        """
+        Remove caption noise from a transcript.
+
+            >>> TranscriptCleaner().clean("uh-huh that is right, um, so so the model")[0]
+            'that is right, so the model'
+
+        Returns:
+            tuple[str, dict]: The cleaned text and stats with the number of
+            matches per rule, chars/tokens before and after.
+        """
+        counts = dict.fromkeys(self.rules, 0)
+        if self.pattern is None:
+            cleaned = text
+        else:
+            def replace(match):
+                rule = match.lastgroup
+                # `lastgroup` is the innermost closed group for "repeats".
+                if rule == "phrase":
+                    rule = "repeats"
+                counts[rule] += 1
+                if rule == "repeats":
+                    return match.group("phrase")
+                if rule == "whitespace":
+                    return " "
+                return ""
+
+            cleaned = self.pattern.sub(replace, text).strip()
+        stats = {
+            "rules": counts,
+            "chars_in": len(text),
+            "chars_out": len(cleaned),
+            "tokens_saved": estimate_tokens(text) - estimate_tokens(cleaned),
+        }
+        return cleaned, stats
+
+
+def cleaner_from_env(value: str = None) -> TranscriptCleaner:
+    """Build a cleaner from a comma-separated rule list (TRANSCRIPT_CLEAN_RULES)."""
+    if value is None:
+        return TranscriptCleaner()
+    return TranscriptCleaner(tuple(rule.strip() for rule in value.split(",") if rule.strip()))
+
+
+def merge_stats(total, stats: dict) -> dict:
+    """Add the stats of one `clean` call (e.g. of one caption chunk) to a running total (or None)."""
+    if total is None:
+        return {**stats, "rules": dict(stats["rules"])}
+    for rule, count in stats["rules"].items():
+        total["rules"][rule] = total["rules"].get(rule, 0) + count
+    for key in ("chars_in", "chars_out", "tokens_saved"):
+        total[key] += stats[key]
+    return total
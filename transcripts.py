@@ -0,0 +1,131 @@
+"""
+Canonical YouTube video IDs, a persistent transcript cache and an async
+stream of the Documents a transcript loader produces.
+"""
+from urllib.parse import urlparse, parse_qs
+from store import BlobStore, default_path
+import asyncio, os, re, threading
+
+VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")
+YOUTUBE_HOSTS = ("youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com",
+                 "youtube-nocookie.com", "www.youtube-nocookie.com")
+
+
+def canonical_video_id(url: str):
+    """
+    Extract the 11 character video ID from any common YouTube URL form.
+
+    Handles youtu.be/<id>, watch?v=<id>, shorts/, embed/, live/ and v/ paths
+    with or without scheme, www/m subdomains and extra query parameters.
+
+    Returns:
+        str | None: The video ID, or None if the URL is not a video link.
+    """
+    if not url:
+        return None
+    url = url.strip()
+    if VIDEO_ID_PATTERN.match(url):
+        return url
+    if "://" not in url:
+        url = "https://" + url
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    parts = [p for p in parsed.path.split("/") if p]
+    candidate = None
+    if host in ("youtu.be", "www.youtu.be"):
+        candidate = parts[0] if parts else None
+    elif host in YOUTUBE_HOSTS:
+        if parts[:1] == ["watch"] or not parts:
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+        elif len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v", "e"):
+            candidate = parts[1]
+    if candidate and VIDEO_ID_PATTERN.match(candidate):
+        return candidate
+    return None
+
+
+class TranscriptCache:
+    """
+    Transcripts stored per (video ID, language list, chunk length), compressed on disk.
+
+    Documents are kept as their page_content and metadata so a hit rebuilds
+    exactly what `YoutubeLoader.load()` returned. The loader's chunk length
+    (and the FORMAT version) are part of the key, so entries written with
+    another chunking or by an older format are never reused.
+    """
+
+    FORMAT = "chunks-v1"
+
+    def __init__(self, path: str = None, max_bytes: int = 512 * 1024 * 1024, ttl: float = None):
+        self.store = BlobStore(path or default_path("transcripts.sqlite"), "transcripts",
+                               max_bytes=max_bytes, ttl=ttl)
+
+    @classmethod
+    def key(cls, video_id: str, languages, chunk_seconds: int) -> str:
+        if isinstance(languages, str):
+            languages = [languages]
+        return f"{video_id}:{','.join(languages)}:{cls.FORMAT}:{chunk_seconds}s"
+
+    def get(self, video_id: str, languages, chunk_seconds: int):
+        """Return the cached list of Documents or None."""
+        from langchain_core.documents import Document
+        data = self.store.get(self.key(video_id, languages, chunk_seconds))
+        if data is None:
+            return None
+        return [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in data]
+
+    def put(self, video_id: str, languages, chunk_seconds: int, documents):
+        self.store.put(self.key(video_id, languages, chunk_seconds), [
+            {"page_content": d.page_content, "metadata": dict(d.metadata)} for d in documents
+        ])
+
+
+def transcript_cache_from_env():
+    """Build the cache configured by TRANSCRIPT_CACHE_* variables, or None if disabled."""
+    if os.getenv("TRANSCRIPT_CACHE", "1") == "0":
+        return None
+    ttl = os.getenv("TRANSCRIPT_CACHE_TTL")
+    return TranscriptCache(
+        path=os.getenv("TRANSCRIPT_CACHE_PATH"),
+        max_bytes=int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "512")) * 1024 * 1024,
+        ttl=float(ttl) if ttl else None,
+    )
+
+
+async def stream_documents(loader):
+    """
+    Yield a loader's Documents as they are produced.
+
+    The loader runs in a worker thread; each Document of its `lazy_load()`
+    is handed over as soon as it exists, so the consumer can work on the
+    start of a transcript while the rest is still being fetched. Loaders
+    that only implement `load()` arrive in one go.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            documents = loader.lazy_load() if hasattr(loader, "lazy_load") else loader.load()
+            for document in documents:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, document)
+            item = done
+        except Exception as e:
+            item = e
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
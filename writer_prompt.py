@@ -0,0 +1,171 @@
+"""
+Token-budgeted prompt assembly for the writer node.
+
+The writer combines three sources: the keypoints, the model explanation
+(summary_1) and the web snippets (summary_2). Each gets a share of a token
+budget that grows with the requested summary length; a source that needs
+less than its share hands the rest to the others. Snippets are grouped per
+keypoint, near-duplicates are dropped and each one is trimmed, and the
+finished prompt is kept under an input ceiling.
+"""
+from dedup import jaccard, normalize
+from planner import CHARS_PER_TOKEN, estimate_tokens
+import re
+
+# Source tokens per summary length, before the ceiling is applied.
+LENGTH_BUDGETS = {"short": 2500, "medium": 5000, "long": 9000}
+SHARES = {"keypoints": 0.2, "summary_1": 0.35, "summary_2": 0.45}
+SNIPPETS_PER_KEYPOINT = 2
+SNIPPET_DUPLICATE_THRESHOLD = 0.6
+CUT_POINTS = (re.compile(r"\n"), re.compile(r"[.!?]\s"), re.compile(r"\s"))
+
+
+def trim_to_tokens(text: str, tokens: int) -> str:
+    """Cut `text` to about `tokens` tokens at a line, sentence or word boundary."""
+    limit = max(0, tokens) * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    window = limit - limit // 4
+    for pattern in CUT_POINTS:
+        cut = None
+        for match in pattern.finditer(text, window, limit):
+            cut = match.start() + (1 if pattern is CUT_POINTS[1] else 0)
+        if cut is not None:
+            return text[:cut].rstrip() + " …"
+    return text[:limit].rstrip() + " …"
+
+
+def allocate(needs: dict, budget: int, shares: dict = SHARES) -> dict:
+    """
+    Split `budget` tokens between sources in proportion to `shares`.
+
+    A source never gets more than it needs; what it leaves over is shared
+    out again among the sources that still need more.
+    """
+    granted = dict.fromkeys(needs, 0)
+    open_sources = {name for name, need in needs.items() if need > 0}
+    remaining = budget
+    while open_sources and remaining > 0:
+        total_share = sum(shares[name] for name in open_sources)
+        spent = 0
+        for name in sorted(open_sources):
+            offer = int(remaining * shares[name] / total_share)
+            grant = min(offer, needs[name] - granted[name])
+            granted[name] += grant
+            spent += grant
+        open_sources = {name for name in open_sources if granted[name] < needs[name]}
+        remaining -= spent
+        if spent == 0:
+            break
+    return granted
+
+
+def render_snippets(results: list, budget: int) -> str:
+    """
+    Web results grouped per keypoint, near-duplicates dropped, within `budget` tokens.
+
+    Args:
+        results (list[dict]): [{'keypoint', 'information', 'url'}] from summary2.
+    """
+    grouped = {}
+    for item in results or []:
+        info = " ".join((item.get("information") or "").split())
+        if info:
+            grouped.setdefault(item.get("keypoint") or "", []).append((info, item.get("url") or ""))
+    if not grouped:
+        return ""
+    blocks = []
+    for keypoint, snippets in grouped.items():
+        kept, seen = [], []
+        for info, url in snippets:
+            words = normalize(info)
+            if any(jaccard(words, other) >= SNIPPET_DUPLICATE_THRESHOLD for other in seen):
+                continue
+            seen.append(words)
+            kept.append((info, url))
+            if len(kept) == SNIPPETS_PER_KEYPOINT:
+                break
+        blocks.append((keypoint, kept))
+
+    def render(keypoint, kept, room=None):
+        lines = [f"- {keypoint}"]
+        for info, url in kept:
+            if room is not None:
+                share = room // len(kept) - estimate_tokens(f"  -  (URL: {url})")
+                if share <= 0:
+                    continue
+                info = trim_to_tokens(info, share)
+            lines.append(f"  - {info} (URL: {url})")
+        return "\n".join(lines)
+
+    # Keypoints with short snippets leave their unused share to the others.
+    needs = {i: estimate_tokens(render(*block)) for i, block in enumerate(blocks)}
+    granted = allocate(needs, budget, dict.fromkeys(needs, 1))
+    rendered = []
+    for i, (keypoint, kept) in enumerate(blocks):
+        if granted[i] >= needs[i]:
+            rendered.append(render(keypoint, kept))
+        else:
+            rendered.append(render(keypoint, kept, granted[i] - estimate_tokens(f"- {keypoint}")))
+    return "\n".join(rendered)
+
+
+def assemble_writer_prompt(template: str, summary_1: str, summary_2, keypoints: str,
+                           summary_length: str = "medium", ceiling: int = 12000):
+    """
+    Fill the writer template with budgeted sources.
+
+    Args:
+        template (str): Prompt with {user_length}, {summary1}, {summary2}
+            and {topics} placeholders.
+        summary_1 (str): Model explanation of the keypoints.
+        summary_2 (list[dict] | str): Web results of the keypoints.
+        keypoints (str): Consolidated keypoint list.
+        summary_length (str): short / medium / long.
+        ceiling (int): Maximum estimated tokens of the whole prompt.
+
+    Returns:
+        tuple[str, dict]: The prompt and a report of the budget split
+        ({'budget', 'ceiling', 'sources': {name: {'need', 'granted', 'used'}},
+        'prompt_tokens'}).
+    """
+    summary_1 = summary_1 or ""
+    keypoints = keypoints or ""
+    instructions = estimate_tokens(template.format(user_length=summary_length, summary1="",
+                                                   summary2="", topics=""))
+    budget = min(LENGTH_BUDGETS.get(summary_length, LENGTH_BUDGETS["medium"]), ceiling - instructions)
+
+    if isinstance(summary_2, list):
+        full_snippets = render_snippets(summary_2, 10 ** 9)
+    else:
+        full_snippets = str(summary_2 or "")
+    needs = {
+        "keypoints": estimate_tokens(keypoints),
+        "summary_1": estimate_tokens(summary_1),
+        "summary_2": estimate_tokens(full_snippets),
+    }
+
+    while True:
+        granted = allocate(needs, max(0, budget))
+        sources = {
+            "keypoints": trim_to_tokens(keypoints, granted["keypoints"]),
+            "summary_1": trim_to_tokens(summary_1, granted["summary_1"]),
+            "summary_2": (render_snippets(summary_2, granted["summary_2"]) if isinstance(summary_2, list)
+                          else trim_to_tokens(full_snippets, granted["summary_2"])),
+        }
+        prompt = template.format(user_length=summary_length, summary1=sources["summary_1"],
+                                 summary2=sources["summary_2"], topics=sources["keypoints"])
+        overflow = estimate_tokens(prompt) - ceiling
+        if overflow <= 0 or budget <= 0:
+            break
+        budget -= overflow  # trimming marks and snippet headers can overshoot a little
+
+    report = {
+        "summary_length": summary_length,
+        "budget": budget,
+        "ceiling": ceiling,
+        "sources": {name: {"need": needs[name], "granted": granted[name],
+                           "used": estimate_tokens(sources[name])} for name in needs},
+        "prompt_tokens": estimate_tokens(prompt),
+    }
+    return prompt, report